@@ -0,0 +1,296 @@
+"""Benchmark hashers and authentication backends.
+
+Usage:
+    python scripts/benchmark.py [--output results.json] [--compare old.json]
+
+Results are written as JSON. With `--compare`, the script exits with a
+non-zero status if any benchmark got slower than the given threshold.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import platform
+import statistics
+import sys
+import time
+import typing
+
+from starlette.authentication import SimpleUser, requires
+from starlette.applications import Starlette
+from starlette.requests import HTTPConnection
+from starlette.responses import PlainTextResponse
+
+import starlette_auth_toolkit
+from starlette_auth_toolkit.backends import MultiAuth
+from starlette_auth_toolkit.base.backends import BaseBasicAuth, BaseTokenAuth
+from starlette_auth_toolkit.cryptography import (
+    Argon2Hasher,
+    BaseHasher,
+    BCryptHasher,
+    CryptHasher,
+    MultiHasher,
+    PBKDF2Hasher,
+)
+from starlette_auth_toolkit.middleware import AuthMiddleware
+
+USERNAME = "bob"
+PASSWORD = "s3kr3t"
+TOKEN = "t0k3n"
+
+
+def summarize(timings: typing.List[float]) -> dict:
+    timings = sorted(timings)
+    return {
+        "n": len(timings),
+        "mean": statistics.mean(timings),
+        "median": statistics.median(timings),
+        "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+
+def measure(func: typing.Callable[[], typing.Any], iterations: int) -> dict:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+async def measure_async(
+    func: typing.Callable[[], typing.Awaitable], iterations: int
+) -> dict:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+def get_hashers() -> typing.Dict[str, BaseHasher]:
+    hashers: typing.Dict[str, BaseHasher] = {}
+    for name, factory in [
+        ("pbkdf2", PBKDF2Hasher),
+        ("bcrypt", BCryptHasher),
+        ("argon2", Argon2Hasher),
+        ("crypt", CryptHasher),
+    ]:
+        hasher = factory()
+        try:
+            hasher.make_sync("test")
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"Skipping {name}: {exc}", file=sys.stderr)
+            continue
+        hashers[name] = hasher
+    hashers["multi"] = MultiHasher(list(hashers.values()))
+    return hashers
+
+
+def bench_hashers(hashers: typing.Dict[str, BaseHasher], iterations: int):
+    results = {}
+    for name, hasher in hashers.items():
+        hashed = hasher.make_sync(PASSWORD)
+        results[f"hasher.{name}.make"] = measure(
+            lambda: hasher.make_sync(PASSWORD), iterations
+        )
+        results[f"hasher.{name}.verify"] = measure(
+            lambda: hasher.verify_sync(PASSWORD, hashed), iterations
+        )
+    return results
+
+
+def get_basic_auth(hasher: BaseHasher) -> BaseBasicAuth:
+    password_hash = hasher.make_sync(PASSWORD)
+
+    class BasicAuth(BaseBasicAuth):
+        async def find_user(self, username: str):
+            return SimpleUser(username) if username == USERNAME else None
+
+        async def verify_password(self, user, password: str) -> bool:
+            return await hasher.verify(password, password_hash)
+
+    return BasicAuth()
+
+
+def get_token_auth(scheme: str = "Token") -> BaseTokenAuth:
+    class TokenAuth(BaseTokenAuth):
+        async def verify(self, token: str):
+            return SimpleUser(USERNAME) if token == TOKEN else None
+
+    backend = TokenAuth()
+    backend.scheme = scheme
+    return backend
+
+
+def get_app(backend) -> Starlette:
+    app = Starlette()
+    app.add_middleware(AuthMiddleware, backend=backend)
+
+    @app.route("/")
+    @requires("authenticated")
+    async def home(request):  # pylint: disable=unused-argument
+        return PlainTextResponse("Hello, world!")
+
+    return app
+
+
+def get_scope(authorization: str) -> dict:
+    return {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"authorization", authorization.encode("latin-1"))],
+        "client": ("127.0.0.1", 12345),
+        "server": ("127.0.0.1", 8000),
+    }
+
+
+async def request(app, authorization: str) -> int:
+    status = 0
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(get_scope(authorization), receive, send)
+    return status
+
+
+async def bench_throughput(
+    backends: typing.Dict[str, typing.Tuple[typing.Any, str]],
+    concurrency: int,
+    requests: int,
+) -> dict:
+    results = {}
+    for name, (backend, authorization) in backends.items():
+        app = get_app(backend)
+        assert await request(app, authorization) == 200
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited_request() -> None:
+            async with semaphore:
+                await request(app, authorization)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(limited_request() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+        results[f"throughput.{name}"] = {
+            "concurrency": concurrency,
+            "requests": requests,
+            "elapsed": elapsed,
+            "requests_per_second": requests / elapsed,
+        }
+    return results
+
+
+async def bench_dispatch(iterations: int, sizes: typing.List[int]) -> dict:
+    results = {}
+    for size in sizes:
+        # The matching backend comes last, which is the worst case.
+        backends = [get_token_auth(f"Token{i}") for i in range(size)]
+        backend = MultiAuth(backends)
+        scope = get_scope(f"Token{size - 1} {TOKEN}")
+        assert await backend.authenticate(HTTPConnection(scope)) is not None
+
+        async def authenticate() -> None:
+            await backend.authenticate(HTTPConnection(scope))
+
+        results[f"dispatch.multi.{size}"] = await measure_async(
+            authenticate, iterations
+        )
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> bool:
+    ok = True
+    for name, result in results.items():
+        old = baseline.get("results", {}).get(name)
+        if old is None:
+            continue
+        if "median" in result:
+            ratio = result["median"] / old["median"]
+        else:
+            ratio = old["requests_per_second"] / result["requests_per_second"]
+        if ratio > 1 + threshold:
+            print(f"REGRESSION {name}: {ratio:.2f}x slower", file=sys.stderr)
+            ok = False
+    return ok
+
+
+async def main(args: argparse.Namespace) -> int:
+    hashers = get_hashers()
+    results = {}
+    results.update(bench_hashers(hashers, args.iterations))
+
+    credentials = base64.b64encode(f"{USERNAME}:{PASSWORD}".encode())
+    basic = f"Basic {credentials.decode()}"
+    results.update(
+        await bench_throughput(
+            {
+                "basic": (get_basic_auth(hashers["pbkdf2"]), basic),
+                "token": (get_token_auth(), f"Token {TOKEN}"),
+                "multi": (
+                    MultiAuth(
+                        [get_token_auth(), get_basic_auth(hashers["pbkdf2"])]
+                    ),
+                    f"Token {TOKEN}",
+                ),
+            },
+            concurrency=args.concurrency,
+            requests=args.requests,
+        )
+    )
+    results.update(
+        await bench_dispatch(args.iterations * 10, sizes=[1, 2, 4, 8, 16, 32])
+    )
+
+    output = {
+        "version": starlette_auth_toolkit.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    content = json.dumps(output, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(content)
+    else:
+        print(content)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.threshold):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--output", help="write results to this file")
+    parser.add_argument("--compare", help="baseline results to compare with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="relative slowdown considered a regression (default: 0.2)",
+    )
+    sys.exit(
+        asyncio.get_event_loop().run_until_complete(main(parser.parse_args()))
+    )
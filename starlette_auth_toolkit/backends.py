@@ -1,20 +1,118 @@
+import time
 import typing
 
 from starlette import authentication as auth
 from starlette.requests import HTTPConnection
 
-from .base.backends import AuthBackend
+from .base.backends import (
+    RESUME_SCHEME,
+    AuthBackend,
+    BaseTokenAuth,
+    _BaseSchemeAuth,
+    is_websocket,
+    parse_authorization,
+)
+from .cache import TTLCache
+from .cryptography import hash_token
 from .datatypes import AuthResult
+from .exceptions import InvalidCredentials
+from .metrics import Observer
+from .signing import Signer
+
+
+def _is_dispatchable(backend: AuthBackend) -> bool:
+    # Scheme backends that read credentials from the Authorization header
+    # the standard way can be given pre-parsed credentials.
+    return isinstance(backend, _BaseSchemeAuth) and backend.authorization_only
 
 
 class MultiAuth(AuthBackend):
-    def __init__(self, backends: typing.List[AuthBackend]):
+    def __init__(
+        self, backends: typing.List[AuthBackend], *, observer: Observer = None
+    ):
         self.backends = backends
+        self.observer = observer
+
+        # For each scheme, the backends that may accept it, in order.
+        # Other scheme backends would return `None`, so they are skipped.
+        entries = [
+            (backend, _is_dispatchable(backend)) for backend in backends
+        ]
+        schemes = {
+            backend.scheme.lower()
+            for backend, dispatchable in entries
+            if dispatchable
+        }
+        self._candidates = {
+            scheme: [
+                (backend, dispatchable)
+                for backend, dispatchable in entries
+                if not dispatchable or backend.scheme.lower() == scheme
+            ]
+            for scheme in (*schemes, None)
+        }
+        # Resume tickets may have been issued by any scheme backend.
+        self._resumable = [
+            backend
+            for backend, dispatchable in entries
+            if dispatchable and RESUME_SCHEME.lower() not in schemes
+        ]
+        self._authorization_only = all(
+            getattr(backend, "authorization_only", False)
+            for backend in backends
+        )
+
+    @property
+    def authorization_only(self) -> bool:
+        return self._authorization_only
 
     async def authenticate(self, conn: HTTPConnection) -> AuthResult:
-        for backend in self.backends:
+        if self.observer is None:
+            return await self._authenticate(conn)
+
+        started_at = time.perf_counter()
+        try:
+            auth_result = await self._authenticate(conn)
+        except auth.AuthenticationError:
+            self._count("failure")
+            raise
+        finally:
+            self._observe("authenticate", started_at)
+        self._count("skip" if auth_result is None else "success")
+        return auth_result
+
+    async def _authenticate(self, conn: HTTPConnection) -> AuthResult:
+        authorization = parse_authorization(conn)
+        if authorization is None:
+            scheme, credentials = None, ""
+        else:
+            scheme, credentials = authorization
+
+        if scheme == RESUME_SCHEME.lower() and is_websocket(conn):
+            resumable = [
+                backend
+                for backend in self._resumable
+                if backend.resume_signer is not None
+            ]
+            for backend in resumable:
+                auth_result = await backend.authenticate_resume_ticket(
+                    conn, credentials
+                )
+                if auth_result is not None:
+                    return auth_result
+            if resumable:
+                raise InvalidCredentials
+
+        candidates = self._candidates.get(scheme, self._candidates[None])
+
+        for backend, dispatchable in candidates:
             try:
-                auth_result = await backend.authenticate(conn)
+                if dispatchable:
+                    auth_result = await backend.authenticate_credentials(
+                        conn, credentials
+                    )
+                else:
+                    auth_result = await backend.authenticate(conn)
             except auth.AuthenticationError as exc:
                 raise exc from None
 
@@ -24,3 +122,54 @@ class MultiAuth(AuthBackend):
             return auth_result
 
         return None
+
+
+class SignedTokenAuth(BaseTokenAuth):
+    def __init__(
+        self,
+        signer: Signer,
+        *,
+        cache: TTLCache = None,
+        observer: Observer = None,
+    ):
+        self.signer = signer
+        self.cache = cache
+        self.observer = observer
+
+    def create_token(self, subject: str, **claims: typing.Any) -> str:
+        return self.signer.dumps({"sub": subject, **claims})
+
+    def get_claims(
+        self, token: str
+    ) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        if self.cache is None:
+            return self.signer.loads(token)
+
+        digest = hash_token(token)
+        claims = self.cache.get(digest)
+        if claims is not None:
+            # Tokens may have expired since they were cached.
+            return claims if self.signer.validate(claims) else None
+
+        claims = self.signer.loads(token)
+        if claims is not None:
+            ttl = self.cache.ttl
+            if "exp" in claims:
+                ttl = min(ttl, claims["exp"] - time.time())
+            self.cache.set(digest, claims, ttl=ttl)
+
+        return claims
+
+    def get_user(
+        self, claims: typing.Dict[str, typing.Any]
+    ) -> typing.Optional[auth.BaseUser]:
+        subject = claims.get("sub")
+        if subject is None:
+            return None
+        return auth.SimpleUser(subject)
+
+    async def verify(self, token: str) -> typing.Optional[auth.BaseUser]:
+        claims = self.get_claims(token)
+        if claims is None:
+            return None
+        return self.get_user(claims)
@@ -1,29 +1,100 @@
 import base64
 import binascii
+import time
 import typing
 
 from starlette import authentication as auth
 from starlette.requests import HTTPConnection
 
-from ..datatypes import AuthResult
-from ..exceptions import InvalidCredentials
+from ..cache import CredentialsCache, ScopesCache
+from ..cryptography import HMACHasher, generate_random_string
+from ..datatypes import APIKey, AuthResult
+from ..exceptions import InvalidCredentials, TooManyAttempts
+from ..metrics import AUTH_ATTEMPTS, AUTH_DURATION, Observer
+from ..ratelimit import RateLimiter
+from ..signing import Signer
+from ..timing import TimingStrategy
+
+# Authorization scheme used to present resume tickets.
+RESUME_SCHEME = "Resume"
+# Where resume tickets issued on WebSocket connections are stored.
+RESUME_TICKET_SCOPE_KEY = "starlette_auth_toolkit.resume_ticket"
 
 
 class AuthBackend(auth.AuthenticationBackend):
+    # Whether credentials are only ever read from the Authorization header.
+    authorization_only = False
+    observer: typing.Optional[Observer] = None
+    scopes_cache: typing.Optional[ScopesCache] = None
+
     async def authenticate(self, conn: HTTPConnection) -> AuthResult:
         raise NotImplementedError
 
+    async def get_scopes(
+        self, user: auth.BaseUser  # pylint: disable=unused-argument
+    ) -> typing.Iterable[str]:
+        return ["authenticated"]
+
+    async def get_auth_credentials(
+        self, user: auth.BaseUser
+    ) -> auth.AuthCredentials:
+        if self.scopes_cache is None:
+            return auth.AuthCredentials(await self.get_scopes(user))
+        scopes = await self.scopes_cache.get(user, self.get_scopes)
+        return auth.AuthCredentials(scopes)
+
+    def _observe(self, phase: str, started_at: float) -> None:
+        # Callers check `self.observer` first, so that no time is spent
+        # measuring when metrics are disabled.
+        self.observer.observe(
+            AUTH_DURATION,
+            time.perf_counter() - started_at,
+            {"backend": type(self).__name__, "phase": phase},
+        )
+
+    def _count(self, outcome: str) -> None:
+        self.observer.increment(
+            AUTH_ATTEMPTS, {"backend": type(self).__name__, "outcome": outcome}
+        )
+
+
+def parse_authorization(
+    conn: HTTPConnection
+) -> typing.Optional[typing.Tuple[str, str]]:
+    authorization = conn.headers.get("Authorization")
+    if authorization is None:
+        return None
+
+    scheme, _, credentials = authorization.partition(" ")
+    return scheme.lower(), credentials
+
+
+# Resume tickets are only accepted on WebSocket connections.
+def is_websocket(conn: HTTPConnection) -> bool:
+    return conn.scope["type"] == "websocket"
+
 
 class _BaseSchemeAuth(AuthBackend):
     scheme: str
+    # When set, WebSocket connections are issued a short-lived ticket that
+    # can be presented instead of credentials on reconnect.
+    resume_signer: typing.Optional[Signer] = None
+
+    @property
+    def authorization_only(self) -> bool:
+        cls = type(self)
+        return (
+            cls.get_credentials is _BaseSchemeAuth.get_credentials
+            and cls.authenticate is _BaseSchemeAuth.authenticate
+        )
 
     def get_credentials(self, conn: HTTPConnection) -> typing.Optional[str]:
-        if "Authorization" not in conn.headers:
+        authorization = parse_authorization(conn)
+        if authorization is None:
             return None
 
-        authorization = conn.headers.get("Authorization")
-        scheme, _, credentials = authorization.partition(" ")
-        if scheme.lower() != self.scheme.lower():
+        scheme, credentials = authorization
+        if scheme != self.scheme.lower():
             return None
 
         return credentials
@@ -35,35 +106,187 @@ class _BaseSchemeAuth(AuthBackend):
         ..., typing.Awaitable[typing.Optional[auth.BaseUser]]
     ]
 
-    async def authenticate(self, conn: HTTPConnection):
-        credentials = self.get_credentials(conn)
+    async def authenticate(self, conn: HTTPConnection) -> AuthResult:
+        if self.resume_signer is not None and is_websocket(conn):
+            authorization = parse_authorization(conn)
+            if (
+                authorization is not None
+                and authorization[0] == RESUME_SCHEME.lower()
+            ):
+                auth_result = await self.authenticate_resume_ticket(
+                    conn, authorization[1]
+                )
+                if auth_result is None:
+                    raise InvalidCredentials
+                return auth_result
+
+        if self.observer is None:
+            credentials = self.get_credentials(conn)
+        else:
+            started_at = time.perf_counter()
+            credentials = self.get_credentials(conn)
+            self._observe("parse", started_at)
+
         if credentials is None:
+            if self.observer is not None:
+                self._count("skip")
             return None
 
+        return await self.authenticate_credentials(conn, credentials)
+
+    async def authenticate_credentials(
+        self, conn: HTTPConnection, credentials: str
+    ) -> AuthResult:
+        if self.observer is None:
+            auth_result = await self._authenticate_credentials(
+                conn, credentials
+            )
+        else:
+            started_at = time.perf_counter()
+            try:
+                auth_result = await self._authenticate_credentials(
+                    conn, credentials
+                )
+            except auth.AuthenticationError:
+                self._count("failure")
+                raise
+            finally:
+                self._observe("authenticate", started_at)
+            self._count("success")
+
+        if self.resume_signer is not None and is_websocket(conn):
+            conn.scope[RESUME_TICKET_SCOPE_KEY] = self.create_resume_ticket(
+                *auth_result
+            )
+
+        return auth_result
+
+    async def _authenticate_credentials(
+        self,
+        conn: HTTPConnection,  # pylint: disable=unused-argument
+        credentials: str,
+    ) -> AuthResult:
         parts = self.parse_credentials(credentials)
         user = await self.verify(*parts)
         if user is None:
             raise InvalidCredentials
 
-        return auth.AuthCredentials(["authenticated"]), user
+        return await self.get_auth_credentials(user), user
+
+    def get_resume_claims(self, user: auth.BaseUser) -> typing.Dict[str, str]:
+        return {"sub": user.display_name}
+
+    def get_resumed_user(
+        self, claims: typing.Dict[str, typing.Any]
+    ) -> typing.Optional[auth.BaseUser]:
+        subject = claims.get("sub")
+        if subject is None:
+            return None
+        return auth.SimpleUser(subject)
+
+    def create_resume_ticket(
+        self, credentials: auth.AuthCredentials, user: auth.BaseUser
+    ) -> str:
+        assert self.resume_signer is not None
+        claims = self.get_resume_claims(user)
+        return self.resume_signer.dumps(
+            {
+                **claims,
+                "scheme": self.scheme.lower(),
+                "scopes": credentials.scopes,
+            }
+        )
+
+    # Returns `None` if the ticket was not issued by this backend (or has
+    # expired), so that other backends can be tried.
+    async def authenticate_resume_ticket(
+        self,
+        conn: HTTPConnection,  # pylint: disable=unused-argument
+        ticket: str,
+    ) -> AuthResult:
+        if self.resume_signer is None:
+            return None
+
+        claims = self.resume_signer.loads(ticket)
+        if claims is None or claims.get("scheme") != self.scheme.lower():
+            return None
+
+        user = self.get_resumed_user(claims)
+        if user is None:
+            raise InvalidCredentials
+
+        if self.observer is not None:
+            self._count("resume")
+        return auth.AuthCredentials(claims.get("scopes", [])), user
 
 
 class BaseBasicAuth(_BaseSchemeAuth):
     scheme = "Basic"
+    credentials_cache: typing.Optional[CredentialsCache] = None
+    username_limiter: typing.Optional[RateLimiter] = None
+    client_limiter: typing.Optional[RateLimiter] = None
+    timing_strategy: typing.Optional[TimingStrategy] = None
+
+    # Length of base64-encoded credentials above which they are rejected
+    # without being decoded.
+    max_credentials_length = 1024
 
     def parse_credentials(self, credentials: str) -> typing.List[str]:
-        try:
-            decoded_credentials = base64.b64decode(credentials).decode("ascii")
-        except (ValueError, UnicodeDecodeError, binascii.Error):
+        if len(credentials) > self.max_credentials_length:
             raise InvalidCredentials
 
         try:
-            username, password = decoded_credentials.split(":")
-        except ValueError:
+            decoded_credentials = base64.b64decode(
+                credentials, validate=True
+            ).decode("utf-8")
+        except (ValueError, binascii.Error):
+            raise InvalidCredentials
+
+        # Passwords may contain colons, but usernames can't (RFC 7617).
+        username, colon, password = decoded_credentials.partition(":")
+        if not colon:
             raise InvalidCredentials
 
         return [username, password]
 
+    def get_rate_limits(
+        self, conn: HTTPConnection, username: str
+    ) -> typing.List[typing.Tuple[RateLimiter, str]]:
+        limits = []
+        if self.username_limiter is not None:
+            limits.append((self.username_limiter, f"username:{username}"))
+        if self.client_limiter is not None and conn.client is not None:
+            limits.append((self.client_limiter, f"client:{conn.client.host}"))
+        return limits
+
+    async def _authenticate_credentials(
+        self, conn: HTTPConnection, credentials: str
+    ) -> AuthResult:
+        username, password = self.parse_credentials(credentials)
+
+        # Reserve an attempt before verifying, so that blocked attempts are
+        # cheap and concurrent attempts can't get past the limits together.
+        acquired: typing.List[typing.Tuple[RateLimiter, str]] = []
+        try:
+            for limiter, key in self.get_rate_limits(conn, username):
+                if not await limiter.acquire(key):
+                    raise TooManyAttempts
+                acquired.append((limiter, key))
+            user = await self.verify(username, password)
+        except Exception:
+            # Only failed attempts count against the limits.
+            for limiter, key in acquired:
+                await limiter.refund(key)
+            raise
+
+        if user is None:
+            raise InvalidCredentials
+
+        for limiter, key in acquired:
+            await limiter.refund(key)
+
+        return await self.get_auth_credentials(user), user
+
     async def find_user(self, username: str) -> typing.Optional[auth.BaseUser]:
         raise NotImplementedError
 
@@ -73,15 +296,36 @@ class BaseBasicAuth(_BaseSchemeAuth):
     async def verify(
         self, username: str, password: str
     ) -> typing.Optional[auth.BaseUser]:
-        user = await self.find_user(username=username)
+        cache = self.credentials_cache
+        if cache is not None:
+            user = cache.get(username, password)
+            if user is not None:
+                return user
+
+        if self.observer is None:
+            user = await self.find_user(username=username)
+        else:
+            started_at = time.perf_counter()
+            user = await self.find_user(username=username)
+            self._observe("lookup", started_at)
 
         if user is None:
+            if self.timing_strategy is not None:
+                await self.timing_strategy.on_unknown_user(password)
             return None
 
-        valid = await self.verify_password(user, password)
+        if self.observer is None:
+            valid = await self.verify_password(user, password)
+        else:
+            started_at = time.perf_counter()
+            valid = await self.verify_password(user, password)
+            self._observe("verify", started_at)
         if not valid:
             return None
 
+        if cache is not None:
+            cache.set(username, password, user)
+
         return user
 
 
@@ -94,3 +338,56 @@ class BaseTokenAuth(_BaseSchemeAuth):
 
     async def verify(self, token: str) -> typing.Optional[auth.BaseUser]:
         raise NotImplementedError
+
+
+class BaseAPIKeyAuth(_BaseSchemeAuth):
+    scheme = "Api-Key"
+    key_hasher: HMACHasher
+    key_cache: typing.Optional[CredentialsCache] = None
+    prefix_size = 8
+    secret_size = 32
+
+    def parse_credentials(self, credentials: str) -> typing.List[str]:
+        prefix, _, secret = credentials.partition(".")
+        if not prefix or not secret:
+            raise InvalidCredentials
+        return [prefix, secret]
+
+    def create_key(self) -> typing.Tuple[str, str, str]:
+        # Returns the key to give to the client, and the prefix and digest
+        # to store.
+        prefix = generate_random_string(self.prefix_size)
+        secret = generate_random_string(self.secret_size)
+        digest = self.key_hasher.make_sync(secret)
+        return f"{prefix}.{secret}", prefix, digest
+
+    async def find_key(self, prefix: str) -> typing.Optional[APIKey]:
+        raise NotImplementedError
+
+    async def verify(
+        self, prefix: str, secret: str
+    ) -> typing.Optional[auth.BaseUser]:
+        cache = self.key_cache
+        if cache is not None:
+            user = cache.get(prefix, secret)
+            if user is not None:
+                return user
+
+        if self.observer is None:
+            api_key = await self.find_key(prefix)
+        else:
+            started_at = time.perf_counter()
+            api_key = await self.find_key(prefix)
+            self._observe("lookup", started_at)
+
+        if api_key is None:
+            return None
+
+        # HMAC is fast enough not to need the threadpool.
+        if not self.key_hasher.verify_sync(secret, api_key.digest):
+            return None
+
+        if cache is not None:
+            cache.set(prefix, secret, api_key.user)
+
+        return api_key.user
@@ -0,0 +1,72 @@
+import asyncio
+import typing
+
+_LoadMany = typing.Callable[
+    [typing.List[typing.Any]],
+    typing.Awaitable[typing.Dict[typing.Any, typing.Any]],
+]
+
+
+# Coalesces concurrent lookups into batches, e.g. so that users requested
+# in the same event loop iteration are fetched with a single query.
+# `load_many(keys)` returns a mapping of keys to values, and keys missing
+# from the mapping are loaded as `None`.
+# A batch is dispatched after `wait` seconds (at the next loop iteration
+# by default), or as soon as it holds `max_batch_size` keys.
+class BatchLoader:
+    def __init__(
+        self,
+        load_many: _LoadMany,
+        *,
+        max_batch_size: int = 100,
+        wait: float = 0,
+    ):
+        if max_batch_size <= 0:
+            raise ValueError("'max_batch_size' must be a positive integer")
+        self.load_many = load_many
+        self.max_batch_size = max_batch_size
+        self.wait = wait
+        self.batches = 0
+        self._batch: typing.Dict[typing.Any, asyncio.Future] = {}
+        self._handle: typing.Optional[asyncio.Handle] = None
+
+    async def load(self, key: typing.Any) -> typing.Any:
+        future = self._batch.get(key)
+        if future is None:
+            loop = asyncio.get_event_loop()
+            future = loop.create_future()
+            self._batch[key] = future
+            if len(self._batch) >= self.max_batch_size:
+                self._dispatch()
+            elif self._handle is None:
+                if self.wait > 0:
+                    self._handle = loop.call_later(self.wait, self._dispatch)
+                else:
+                    self._handle = loop.call_soon(self._dispatch)
+
+        # Don't let a cancelled caller cancel the lookup for other callers.
+        return await asyncio.shield(future)
+
+    def _dispatch(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        batch, self._batch = self._batch, {}
+        if batch:
+            self.batches += 1
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(
+        self, batch: typing.Dict[typing.Any, asyncio.Future]
+    ) -> None:
+        try:
+            values = await self.load_many(list(batch))
+        except Exception as exc:  # pylint: disable=broad-except
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(values.get(key))
@@ -0,0 +1,242 @@
+import asyncio
+import functools
+import hashlib
+import hmac
+import secrets
+import time
+import typing
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+# Bounded in-memory mapping with per-entry expiry and LRU eviction.
+class TTLCache:
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: float = 60,
+        *,
+        timer: typing.Callable[[], float] = time.monotonic,
+    ):
+        if max_size <= 0:
+            raise ValueError("'max_size' must be a positive integer")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._timer = timer
+        self._entries: typing.Dict[typing.Any, tuple] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: typing.Any, default: typing.Any = None) -> typing.Any:
+        try:
+            expires_at, value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+
+        if expires_at <= self._timer():
+            del self._entries[key]
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(
+        self, key: typing.Any, value: typing.Any, ttl: float = None
+    ) -> None:
+        if ttl is None:
+            ttl = self.ttl
+        self._entries[key] = (self._timer() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: typing.Any) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+# Remembers users whose `username:password` pair was recently verified.
+# Passwords are never stored: entries hold an HMAC of the credentials,
+# and are indexed by username so they can be invalidated on password change.
+class CredentialsCache:
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: float = 300,
+        *,
+        key: bytes = None,
+        timer: typing.Callable[[], float] = time.monotonic,
+    ):
+        self._key = secrets.token_bytes(32) if key is None else key
+        self._cache = TTLCache(max_size=max_size, ttl=ttl, timer=timer)
+        # Counted here rather than by the underlying cache, so that
+        # wrong passwords for cached users count as misses.
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def _digest(self, username: str, password: str) -> bytes:
+        message = f"{username}:{password}".encode("utf-8")
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def get(self, username: str, password: str) -> typing.Any:
+        entry = self._cache.get(username)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        digest, user = entry
+        if not hmac.compare_digest(digest, self._digest(username, password)):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return user
+
+    def set(self, username: str, password: str, user: typing.Any) -> None:
+        self._cache.set(username, (self._digest(username, password), user))
+
+    def invalidate(self, username: str) -> None:
+        self._cache.delete(username)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+# Read-through cache for async lookups, e.g. of users by username.
+# Missing values (`None`) are cached for `negative_ttl`, and concurrent
+# lookups of the same key share a single call to `load()`.
+class LookupCache:
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: float = 60,
+        *,
+        negative_ttl: float = 5,
+        timer: typing.Callable[[], float] = time.monotonic,
+    ):
+        self.negative_ttl = negative_ttl
+        self._cache = TTLCache(max_size=max_size, ttl=ttl, timer=timer)
+        self._loading: typing.Dict[typing.Any, asyncio.Future] = {}
+
+    @property
+    def hits(self) -> int:
+        return self._cache.hits
+
+    @property
+    def misses(self) -> int:
+        return self._cache.misses
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    async def get(
+        self,
+        key: typing.Any,
+        load: typing.Callable[[typing.Any], typing.Awaitable[typing.Any]],
+    ) -> typing.Any:
+        value = self._cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        loading = self._loading.get(key)
+        if loading is None:
+            loading = asyncio.ensure_future(load(key))
+            self._loading[key] = loading
+            loading.add_done_callback(functools.partial(self._loaded, key))
+
+        # Don't let a cancelled caller cancel the lookup for other callers.
+        return await asyncio.shield(loading)
+
+    def _loaded(self, key: typing.Any, loading: asyncio.Future) -> None:
+        if self._loading.get(key) is not loading:
+            return  # Invalidated while loading.
+        del self._loading[key]
+
+        if loading.cancelled() or loading.exception() is not None:
+            return
+
+        value = loading.result()
+        ttl = self.negative_ttl if value is None else None
+        self._cache.set(key, value, ttl=ttl)
+
+    def invalidate(self, key: typing.Any) -> None:
+        self._cache.delete(key)
+        self._loading.pop(key, None)
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._loading.clear()
+
+
+# Caches the scopes of users, keyed by `key(user)`, which must uniquely
+# identify users (e.g. their primary key). If `version(user)` is given
+# (e.g. a role version stored on users), entries are reloaded when it
+# changes. Equal scope sets are shared between users.
+class ScopesCache:
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: float = 300,
+        *,
+        key: typing.Callable[[typing.Any], typing.Hashable],
+        version: typing.Callable[[typing.Any], typing.Hashable] = None,
+        timer: typing.Callable[[], float] = time.monotonic,
+    ):
+        # No default, as users with the same key share their scopes.
+        self.key = key
+        self.version = version
+        self._cache = TTLCache(max_size=max_size, ttl=ttl, timer=timer)
+        self._interned: typing.Dict[frozenset, frozenset] = {}
+        # Counted here, so that outdated versions count as misses.
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def _intern(self, scopes: frozenset) -> frozenset:
+        interned = self._interned.get(scopes)
+        if interned is not None:
+            return interned
+        if len(self._interned) >= self._cache.max_size:
+            self._interned.clear()
+        self._interned[scopes] = scopes
+        return scopes
+
+    async def get(
+        self,
+        user: typing.Any,
+        load: typing.Callable[
+            [typing.Any], typing.Awaitable[typing.Iterable[str]]
+        ],
+    ) -> typing.FrozenSet[str]:
+        key = self.key(user)
+        version = None if self.version is None else self.version(user)
+
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        scopes = self._intern(frozenset(await load(user)))
+        self._cache.set(key, (version, scopes))
+        return scopes
+
+    def invalidate(self, user: typing.Any) -> None:
+        self._cache.delete(self.key(user))
+
+    def clear(self) -> None:
+        self._cache.clear()
@@ -0,0 +1,74 @@
+import asyncio
+import typing
+from collections import deque
+
+from .exceptions import ServiceUnavailable
+
+
+# Bounds the number of concurrent operations, letting at most `max_waiting`
+# callers queue up for a slot. Callers beyond that are rejected right away.
+class ConcurrencyLimiter:
+    def __init__(self, max_concurrency: int, max_waiting: int = 0):
+        if max_concurrency <= 0:
+            raise ValueError("'max_concurrency' must be a positive integer")
+        if max_waiting < 0:
+            raise ValueError("'max_waiting' must not be negative")
+        self.max_concurrency = max_concurrency
+        self.max_waiting = max_waiting
+        self._waiters: typing.Deque[asyncio.Future] = deque()
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def stats(self) -> typing.Dict[str, int]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+    async def acquire(self) -> None:
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.max_waiting:
+            self.rejected += 1
+            raise ServiceUnavailable
+
+        waiter = asyncio.get_event_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # A slot was handed over to us: pass it on.
+                self.release()
+            elif waiter in self._waiters:
+                # `.release()` may have already skipped and dropped it.
+                self._waiters.remove(waiter)
+            raise
+
+        # `.release()` handed its slot over, so `.active` is unchanged.
+        self.admitted += 1
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    async def __aenter__(self) -> "ConcurrencyLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *args: typing.Any) -> None:
+        self.release()
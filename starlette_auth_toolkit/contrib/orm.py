@@ -1,56 +1,223 @@
+import asyncio
+import functools
+import hmac
 import inspect
+import logging
+import time
 import typing
 
 import orm
 
-from ..base.backends import BaseBasicAuth
-from ..cryptography import BaseHasher
+from ..base.backends import BaseBasicAuth, BaseTokenAuth
+from ..batching import BatchLoader
+from ..cache import CredentialsCache, LookupCache, ScopesCache, TTLCache
+from ..cryptography import BaseHasher, generate_random_string, hash_token
+from ..metrics import Observer
+from ..ratelimit import RateLimiter
+from ..timing import TimingStrategy
 
-_UserModel = typing.Type[orm.Model]
+_Model = typing.Type[orm.Model]
+_LazyModel = typing.Union[_Model, typing.Callable[[], _Model]]
+_UserModel = _Model
 _User = orm.Model
 
+logger = logging.getLogger(__name__)
 
-class ModelBasicAuth(BaseBasicAuth):
-    _model: _UserModel
 
-    def __init__(
-        self,
-        model: typing.Union[_UserModel, typing.Callable[[], _UserModel]],
-        *,
-        hasher: BaseHasher,
-        password_field: str = "password",
-    ):
+class _ModelMixin:
+    _model: _Model
+
+    def _set_model(self, model: _LazyModel) -> None:
         if inspect.isclass(model) and issubclass(model, orm.Model):
             self._get_model = lambda: model
         else:
             assert inspect.isfunction(model)
             self._get_model = model
-        self.hasher = hasher
-        self.password_field = password_field
 
     @property
-    def model(self) -> _UserModel:
+    def model(self) -> _Model:
         try:
             return self._model
         except AttributeError:
             self._model = self._get_model()
             return self._model
 
-    async def find_user(self, username: str) -> typing.Optional[_User]:
+
+class ModelBasicAuth(_ModelMixin, BaseBasicAuth):
+    def __init__(
+        self,
+        model: _LazyModel,
+        *,
+        hasher: BaseHasher,
+        password_field: str = "password",
+        credentials_cache: CredentialsCache = None,
+        rehash_in_background: bool = False,
+        user_cache: LookupCache = None,
+        batch_lookups: bool = False,
+        username_limiter: RateLimiter = None,
+        client_limiter: RateLimiter = None,
+        timing_strategy: TimingStrategy = None,
+        scopes_cache: ScopesCache = None,
+        observer: Observer = None,
+    ):
+        self._set_model(model)
+        self.hasher = hasher
+        self.password_field = password_field
+        self.credentials_cache = credentials_cache
+        self.rehash_in_background = rehash_in_background
+        self.user_cache = user_cache
+        self.user_loader = (
+            BatchLoader(self._get_users) if batch_lookups else None
+        )
+        self.username_limiter = username_limiter
+        self.client_limiter = client_limiter
+        self.timing_strategy = timing_strategy
+        self.scopes_cache = scopes_cache
+        self.observer = observer
+        self._rehashes: typing.Dict[typing.Any, asyncio.Future] = {}
+
+    async def _get_user(self, username: str) -> typing.Optional[_User]:
+        if self.user_loader is not None:
+            return await self.user_loader.load(username)
         try:
             return await self.model.objects.get(username=username)
         except orm.NoMatch:
             return None
 
+    async def _get_users(
+        self, usernames: typing.List[str]
+    ) -> typing.Dict[str, _User]:
+        users = await self.model.objects.filter(username__in=usernames).all()
+        return {user.username: user for user in users}
+
+    async def find_user(self, username: str) -> typing.Optional[_User]:
+        if self.user_cache is None:
+            return await self._get_user(username)
+        return await self.user_cache.get(username, self._get_user)
+
     async def verify_password(self, user: _User, password: str):
         password_hash = getattr(user, self.password_field)
-        valid = await self.hasher.verify(password, password_hash)
+        valid, needs_update = await self.hasher.verify_and_update(
+            password, password_hash
+        )
 
         if not valid:
             return False
 
-        if self.hasher.needs_update(password_hash):
-            new_hash = await self.hasher.make(password)
-            await user.update(**{self.password_field: new_hash})
+        if needs_update:
+            if self.rehash_in_background:
+                self._schedule_rehash(user, password, password_hash)
+            else:
+                await self._rehash(user, password)
 
         return True
+
+    async def _rehash(self, user: _User, password: str) -> None:
+        if self.observer is None:
+            await self._update_hash(user, password)
+            return
+
+        started_at = time.perf_counter()
+        await self._update_hash(user, password)
+        self._observe("rehash", started_at)
+
+    async def _update_hash(self, user: _User, password: str) -> None:
+        new_hash = await self.hasher.make(password)
+        await user.update(**{self.password_field: new_hash})
+
+    def _schedule_rehash(
+        self, user: _User, password: str, password_hash: str
+    ) -> None:
+        # Coalesce concurrent logins of the same user into a single rehash.
+        if user.pk in self._rehashes:
+            return
+        if getattr(user, self.password_field) != password_hash:
+            return  # Already rehashed.
+        rehash = asyncio.ensure_future(self._rehash(user, password))
+        self._rehashes[user.pk] = rehash
+        rehash.add_done_callback(
+            functools.partial(self._on_rehash_done, user.pk)
+        )
+
+    def _on_rehash_done(self, pk: typing.Any, rehash: asyncio.Future) -> None:
+        del self._rehashes[pk]
+        if not rehash.cancelled() and rehash.exception() is not None:
+            logger.error(
+                "Failed to rehash password of user %r",
+                pk,
+                exc_info=rehash.exception(),
+            )
+
+    async def wait_for_rehashes(self) -> None:
+        if self._rehashes:
+            await asyncio.gather(
+                *self._rehashes.values(), return_exceptions=True
+            )
+
+
+class ModelTokenAuth(_ModelMixin, BaseTokenAuth):
+    def __init__(
+        self,
+        model: _LazyModel,
+        *,
+        digest_field: str = "digest",
+        user_field: str = "user",
+        token_size: int = 32,
+        cache: TTLCache = None,
+        scopes_cache: ScopesCache = None,
+        observer: Observer = None,
+    ):
+        self._set_model(model)
+        self.digest_field = digest_field
+        self.user_field = user_field
+        self.token_size = token_size
+        self.cache = cache
+        self.scopes_cache = scopes_cache
+        self.observer = observer
+
+    async def _get_token(self, digest: str) -> typing.Optional[orm.Model]:
+        try:
+            return await self.model.objects.select_related(
+                self.user_field
+            ).get(**{self.digest_field: digest})
+        except orm.NoMatch:
+            return None
+
+    async def verify(self, token: str) -> typing.Optional[_User]:
+        digest = hash_token(token)
+
+        if self.cache is not None:
+            user = self.cache.get(digest)
+            if user is not None:
+                return user
+
+        token_object = await self._get_token(digest)
+        if token_object is None:
+            return None
+
+        if not hmac.compare_digest(
+            getattr(token_object, self.digest_field), digest
+        ):
+            return None
+
+        user = getattr(token_object, self.user_field)
+        if self.cache is not None:
+            self.cache.set(digest, user)
+
+        return user
+
+    async def create_token(self, user: _User) -> str:
+        token = generate_random_string(size=self.token_size)
+        await self.model.objects.create(
+            **{self.digest_field: hash_token(token), self.user_field: user}
+        )
+        return token
+
+    async def revoke_token(self, token: str) -> None:
+        digest = hash_token(token)
+        if self.cache is not None:
+            self.cache.delete(digest)
+
+        token_object = await self._get_token(digest)
+        if token_object is not None:
+            await token_object.delete()
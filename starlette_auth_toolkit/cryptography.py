@@ -1,32 +1,248 @@
+import asyncio
+import base64
+import binascii
+import functools
+import hashlib
+import hmac
+import math
+import os
 import secrets
 import string
+import time
 import typing
+from collections import deque
+from concurrent.futures import Executor
 
 from starlette.concurrency import run_in_threadpool
 
-try:
-    import passlib.hash as _hashers
+from .concurrency import ConcurrencyLimiter
+from .metrics import HASHER_DURATION, HASHER_WAIT, Observer
+
+if typing.TYPE_CHECKING:  # pragma: no cover
     from passlib.ifc import PasswordHash
-except ImportError:  # pragma: no cover
-    _hashers = None  # type: ignore
-    PasswordHash = None  # type: ignore
+
+# Verified against dummy hashes when a password can't be verified for real,
+# so that failures take about as long as a real verification.
+DUMMY_SECRET = "dummysecret"
+
+
+def _get_passlib_registry():
+    # PassLib is imported on first use, so that importing this module
+    # (e.g. for hashers that don't need PassLib) stays fast.
+    try:
+        from passlib import registry
+    except ImportError:  # pragma: no cover
+        return None
+    return registry
+
+
+@functools.lru_cache(maxsize=8)
+def _get_translation(
+    alphabet: str
+) -> typing.Optional[typing.Tuple[bytes, bytes]]:
+    # Map random bytes to characters with `bytes.translate()`.
+    # Bytes above the largest multiple of the alphabet size are deleted
+    # (rejection sampling), so that every character is equally likely.
+    if not alphabet or len(alphabet) > 256:
+        return None
+    if any(ord(char) > 127 for char in alphabet):
+        return None
+    limit = 256 - 256 % len(alphabet)
+    table = bytes(
+        ord(alphabet[value % len(alphabet)]) if value < limit else 0
+        for value in range(256)
+    )
+    return table, bytes(range(limit, 256))
+
+
+def _generate_random_chars(alphabet: str, size: int) -> str:
+    translation = _get_translation(alphabet)
+    if translation is None:
+        return "".join(secrets.choice(alphabet) for _ in range(size))
+
+    table, rejected = translation
+    # Draw enough bytes for most calls to need a single `os.urandom()`.
+    ratio = 256 / (256 - len(rejected))
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = os.urandom(int(remaining * ratio) + 16).translate(
+            table, rejected
+        )[:remaining]
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks).decode("ascii")
 
 
 def generate_random_string(size: int = 32) -> str:
-    return "".join(
-        secrets.choice(generate_random_string.alphabet) for _ in range(size)
-    )
+    return _generate_random_chars(generate_random_string.alphabet, size)
 
 
 generate_random_string.alphabet = string.ascii_letters + string.digits
 
 
+def generate_random_strings(count: int, size: int = 32) -> typing.List[str]:
+    # Draws the randomness for all strings at once.
+    chars = _generate_random_chars(
+        generate_random_string.alphabet, count * size
+    )
+    return [chars[i * size : (i + 1) * size] for i in range(count)]
+
+
+def hash_token(token: str) -> str:
+    # Tokens have enough entropy for a fast, unsalted hash to be safe.
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _get_ident(hashed: str) -> typing.Optional[str]:
+    # Modular crypt format: '$<ident>$...'
+    if not hashed.startswith("$"):
+        return None
+    end = hashed.find("$", 1)
+    if end == -1:
+        return None
+    return hashed[: end + 1]
+
+
+def _b64_encode(data: bytes) -> str:
+    # Unpadded base64, as used by PassLib.
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64_decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def _ab64_encode(data: bytes) -> str:
+    # PassLib's "adapted base64", which uses '.' instead of '+'.
+    return _b64_encode(data).replace("+", ".")
+
+
+def _ab64_decode(data: str) -> bytes:
+    return _b64_decode(data.replace(".", "+"))
+
+
+# Returns how long calling `func(*args)` takes, in seconds.
+def timed(func: typing.Callable, *args: typing.Any) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def _timed_call(
+    func: typing.Callable, *args: typing.Any
+) -> typing.Tuple[float, typing.Any]:
+    # Module-level so that it can be sent to process pools.
+    # The monotonic clock is system-wide, so start times can be compared
+    # across processes.
+    started_at = time.monotonic()
+    return started_at, func(*args)
+
+
 class BaseHasher:
+    def __init__(
+        self,
+        *,
+        executor: Executor = None,
+        limiter: ConcurrencyLimiter = None,
+        observer: Observer = None,
+    ):
+        self.executor = executor
+        self.limiter = limiter
+        self.observer = observer
+
+    def __getstate__(self) -> dict:
+        # Executors, limiters and observers belong to the parent process:
+        # workers only need the hashing logic.
+        state = self.__dict__.copy()
+        state["executor"] = None
+        state["limiter"] = None
+        state["observer"] = None
+        return state
+
+    async def _submit(self, func: typing.Callable, *args: typing.Any):
+        if self.executor is None:
+            return await run_in_threadpool(func, *args)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def _run(self, func: typing.Callable, *args: typing.Any):
+        observer = self.observer
+        if observer is None:
+            return await self._submit(func, *args)
+
+        submitted_at = time.monotonic()
+        started_at, result = await self._submit(_timed_call, func, *args)
+        labels = {
+            "hasher": type(self).__name__,
+            "operation": func.__name__.replace("_sync", ""),
+        }
+        observer.observe(HASHER_WAIT, started_at - submitted_at, labels)
+        observer.observe(
+            HASHER_DURATION, time.monotonic() - submitted_at, labels
+        )
+        return result
+
     async def make(self, secret: str) -> str:
-        return await run_in_threadpool(self.make_sync, secret)
+        return await self._run(self.make_sync, secret)
+
+    async def _run_verification(self, func: typing.Callable, *args: str):
+        if self.limiter is None:
+            return await self._run(func, *args)
+        async with self.limiter:
+            return await self._run(func, *args)
 
     async def verify(self, secret: str, hashed: str) -> bool:
-        return await run_in_threadpool(self.verify_sync, secret, hashed)
+        return await self._run_verification(self.verify_sync, secret, hashed)
+
+    async def verify_and_update(
+        self, secret: str, hashed: str
+    ) -> typing.Tuple[bool, bool]:
+        return await self._run_verification(
+            self.verify_and_update_sync, secret, hashed
+        )
+
+    async def _map(
+        self,
+        func: typing.Callable[..., typing.Awaitable],
+        arguments: typing.Iterable[tuple],
+        concurrency: typing.Optional[int],
+    ) -> typing.AsyncIterator:
+        if concurrency is None:
+            concurrency = os.cpu_count() or 1
+        if concurrency <= 0:
+            raise ValueError("'concurrency' must be a positive integer")
+
+        pending: typing.Deque[asyncio.Future] = deque()
+        try:
+            for args in arguments:
+                pending.append(asyncio.ensure_future(func(*args)))
+                if len(pending) >= concurrency:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def make_many(
+        self,
+        secrets: typing.Iterable[str],  # pylint: disable=redefined-outer-name
+        *,
+        concurrency: int = None,
+    ) -> typing.AsyncIterator[str]:
+        arguments = ((secret,) for secret in secrets)
+        async for hashed in self._map(self.make, arguments, concurrency):
+            yield hashed
+
+    async def verify_many(
+        self,
+        pairs: typing.Iterable[typing.Tuple[str, str]],
+        *,
+        concurrency: int = None,
+    ) -> typing.AsyncIterator[bool]:
+        async for valid in self._map(self.verify, pairs, concurrency):
+            yield valid
 
     def make_sync(self, secret: str) -> str:
         raise NotImplementedError
@@ -34,6 +250,12 @@ class BaseHasher:
     def verify_sync(self, secret: str, hashed: str) -> bool:
         raise NotImplementedError
 
+    def verify_and_update_sync(
+        self, secret: str, hashed: str
+    ) -> typing.Tuple[bool, bool]:
+        valid = self.verify_sync(secret, hashed)
+        return valid, valid and self.needs_update(hashed)
+
     def needs_update(
         self, hashed: str  # pylint: disable=unused-argument
     ) -> bool:
@@ -41,15 +263,87 @@ class BaseHasher:
 
 
 class Hasher(BaseHasher):
-    def __init__(self, algorithm: str):
+    def __init__(
+        self,
+        algorithm: str,
+        *,
+        executor: Executor = None,
+        limiter: ConcurrencyLimiter = None,
+        observer: Observer = None,
+        **settings: typing.Any,
+    ):
+        super().__init__(executor=executor, limiter=limiter, observer=observer)
+        registry = _get_passlib_registry()
         assert (
-            _hashers is not None
+            registry is not None
         ), "'passlib' must be installed to use password hashers"
+        if algorithm not in registry.list_crypt_handlers():
+            raise ValueError(f"unknown algorithm: {algorithm}")
         self.algorithm = algorithm
-        try:
-            self._hasher: PasswordHash = getattr(_hashers, algorithm)
-        except AttributeError as exc:
-            raise ValueError(f"unknown algorithm: {algorithm}") from exc
+        self.settings = settings
+        # Loading a handler may import its backend (e.g. `argon2-cffi`),
+        # so it is deferred until first use.
+        self._handler: typing.Optional["PasswordHash"] = None
+
+    @property
+    def _hasher(self) -> "PasswordHash":
+        if self._handler is None:
+            self._handler = self._load_hasher()
+        return self._handler
+
+    def _load_hasher(self) -> "PasswordHash":
+        hasher = _get_passlib_registry().get_crypt_handler(self.algorithm)
+        if self.settings:
+            hasher = hasher.using(**self.settings)
+        return hasher
+
+    def __getstate__(self) -> dict:
+        # Hashers configured with `.using()` can't be pickled.
+        state = super().__getstate__()
+        state["_handler"] = None
+        return state
+
+    @classmethod
+    def calibrate(
+        cls,
+        *args: typing.Any,
+        target: float,
+        samples: int = 3,
+        **kwargs: typing.Any,
+    ) -> "Hasher":
+        # Only rounds are tuned (e.g. Argon2's `memory_cost` is left as is),
+        # and they are clamped to the algorithm's bounds, so `target` may
+        # not be reachable. Start from the given rounds, if any.
+        rounds = kwargs.pop("rounds", None)
+        hasher = cls(*args, **kwargs)
+        handler = hasher._hasher
+        if "rounds" not in getattr(handler, "setting_kwds", ()):
+            raise ValueError(f"cannot calibrate {hasher.algorithm}")
+
+        if rounds is None:
+            rounds = handler.default_rounds
+        for _ in range(5):
+            hasher = cls(*args, rounds=rounds, **kwargs)
+            hashed = hasher.make_sync("calibration")
+            elapsed = min(
+                timed(hasher.verify_sync, "calibration", hashed)
+                for _ in range(samples)
+            )
+
+            if handler.rounds_cost == "log2":
+                new_rounds = rounds + round(math.log2(target / elapsed))
+            else:
+                new_rounds = round(rounds * target / elapsed)
+            new_rounds = max(
+                handler.min_rounds, min(new_rounds, handler.max_rounds)
+            )
+
+            # Stop once within 5% of the target cost.
+            if abs(new_rounds - rounds) <= 0.05 * rounds:
+                break
+            rounds = new_rounds
+
+        return cls(*args, rounds=rounds, **kwargs)
 
     def make_sync(self, secret: str) -> str:
         return self._hasher.hash(secret)
@@ -63,61 +357,334 @@ class Hasher(BaseHasher):
     def identify(self, hashed: str) -> bool:
         return self._hasher.identify(hashed)
 
+    @property
+    def idents(self) -> typing.Tuple[str, ...]:
+        ident_values = getattr(self._hasher, "ident_values", None)
+        if ident_values:
+            return tuple(ident_values)
+        ident = getattr(self._hasher, "ident", None)
+        if ident:
+            return (ident,)
+        return ()
+
 
 class PBKDF2Hasher(Hasher):
-    def __init__(self):
-        super().__init__("pbkdf2_sha256")
+    def __init__(self, **kwargs: typing.Any):
+        super().__init__("pbkdf2_sha256", **kwargs)
 
 
 # Requires `bcrypt`
 class BCryptHasher(Hasher):
-    def __init__(self):
-        super().__init__("bcrypt")
+    def __init__(self, **kwargs: typing.Any):
+        super().__init__("bcrypt", **kwargs)
 
 
 # Requires `argon2-cffi`
 class Argon2Hasher(Hasher):
-    def __init__(self):
-        super().__init__("argon2")
+    def __init__(self, **kwargs: typing.Any):
+        super().__init__("argon2", **kwargs)
+
+    @property
+    def idents(self) -> typing.Tuple[str, ...]:
+        return ("$argon2id$", "$argon2i$", "$argon2d$")
 
 
 class CryptHasher(Hasher):
-    def __init__(self):
-        super().__init__("sha256_crypt")
+    def __init__(self, **kwargs: typing.Any):
+        super().__init__("sha256_crypt", **kwargs)
 
 
-class MultiHasher(BaseHasher):
-    _dummy_secret = "dummysecret"
+# Keyed hash (HMAC-SHA256) for secrets with enough entropy not to need
+# a slow password hashing algorithm, e.g. API keys.
+class HMACHasher(BaseHasher):
+    def __init__(self, key: typing.Union[str, bytes], **kwargs: typing.Any):
+        super().__init__(**kwargs)
+        self._key = key.encode("utf-8") if isinstance(key, str) else key
+
+    def make_sync(self, secret: str) -> str:
+        return hmac.new(
+            self._key, secret.encode("utf-8"), hashlib.sha256
+        ).hexdigest()
+
+    def verify_sync(self, secret: str, hashed: str) -> bool:
+        return hmac.compare_digest(self.make_sync(secret), hashed)
+
+
+# Built on `hashlib` instead of PassLib. Produces and verifies hashes
+# in PassLib's `pbkdf2_sha256` (or `pbkdf2_sha512`) format.
+class HashlibPBKDF2Hasher(BaseHasher):
+    default_rounds = {"sha256": 29000, "sha512": 25000}
+
+    def __init__(
+        self,
+        *,
+        digest: str = "sha256",
+        rounds: int = None,
+        salt_size: int = 16,
+        **kwargs: typing.Any,
+    ):
+        super().__init__(**kwargs)
+        if digest not in self.default_rounds:
+            raise ValueError(f"unsupported digest: {digest}")
+        self.digest = digest
+        self.rounds = self.default_rounds[digest] if rounds is None else rounds
+        self.salt_size = salt_size
+        self.ident = f"$pbkdf2-{digest}$"
+
+    @property
+    def idents(self) -> typing.Tuple[str, ...]:
+        return (self.ident,)
+
+    def _parse(
+        self, hashed: str
+    ) -> typing.Optional[typing.Tuple[int, bytes, bytes]]:
+        if not hashed.startswith(self.ident):
+            return None
+        try:
+            rounds, salt, checksum = hashed[len(self.ident) :].split("$")
+            return int(rounds), _ab64_decode(salt), _ab64_decode(checksum)
+        except (ValueError, binascii.Error):
+            return None
+
+    def _checksum(self, secret: str, salt: bytes, rounds: int) -> bytes:
+        return hashlib.pbkdf2_hmac(
+            self.digest, secret.encode("utf-8"), salt, rounds
+        )
+
+    def make_sync(self, secret: str) -> str:
+        salt = os.urandom(self.salt_size)
+        checksum = self._checksum(secret, salt, self.rounds)
+        return (
+            f"{self.ident}{self.rounds}"
+            f"${_ab64_encode(salt)}${_ab64_encode(checksum)}"
+        )
+
+    def verify_sync(self, secret: str, hashed: str) -> bool:
+        parsed = self._parse(hashed)
+        if parsed is None:
+            raise ValueError("hash could not be identified")
+        rounds, salt, checksum = parsed
+        return hmac.compare_digest(
+            self._checksum(secret, salt, rounds), checksum
+        )
+
+    def needs_update(self, hashed: str) -> bool:
+        parsed = self._parse(hashed)
+        return parsed is not None and parsed[0] != self.rounds
+
+    def identify(self, hashed: str) -> bool:
+        # Like PassLib, only check the prefix: malformed hashes are
+        # reported when verifying them.
+        return hashed.startswith(self.ident)
+
+
+# (rounds, block_size, parallelism)
+_ScryptCosts = typing.Tuple[int, int, int]
+
+
+# Built on `hashlib` instead of PassLib. Produces and verifies hashes
+# in PassLib's `scrypt` format. Costs are given as in PassLib:
+# `rounds` is the base-2 logarithm of the CPU/memory cost.
+class ScryptHasher(BaseHasher):
+    ident = "$scrypt$"
+
+    def __init__(
+        self,
+        *,
+        rounds: int = 16,
+        block_size: int = 8,
+        parallelism: int = 1,
+        salt_size: int = 16,
+        **kwargs: typing.Any,
+    ):
+        super().__init__(**kwargs)
+        self.rounds = rounds
+        self.block_size = block_size
+        self.parallelism = parallelism
+        self.salt_size = salt_size
+
+    @property
+    def idents(self) -> typing.Tuple[str, ...]:
+        return (self.ident,)
+
+    def _parse(
+        self, hashed: str
+    ) -> typing.Optional[typing.Tuple[_ScryptCosts, bytes, bytes]]:
+        if not hashed.startswith(self.ident):
+            return None
+        try:
+            params, salt, checksum = hashed[len(self.ident) :].split("$")
+            values = dict(param.split("=") for param in params.split(","))
+            costs = (int(values["ln"]), int(values["r"]), int(values["p"]))
+            return costs, _b64_decode(salt), _b64_decode(checksum)
+        except (ValueError, KeyError, binascii.Error):
+            return None
+
+    @staticmethod
+    def _checksum(secret: str, salt: bytes, costs: _ScryptCosts) -> bytes:
+        rounds, block_size, parallelism = costs
+        n = 2 ** rounds
+        return hashlib.scrypt(
+            secret.encode("utf-8"),
+            salt=salt,
+            n=n,
+            r=block_size,
+            p=parallelism,
+            # OpenSSL's default limit (32 MiB) is too low for common costs.
+            maxmem=256 * block_size * (n + parallelism),
+            dklen=32,
+        )
+
+    @property
+    def _costs(self) -> _ScryptCosts:
+        return self.rounds, self.block_size, self.parallelism
+
+    def make_sync(self, secret: str) -> str:
+        salt = os.urandom(self.salt_size)
+        checksum = self._checksum(secret, salt, self._costs)
+        return (
+            f"{self.ident}ln={self.rounds},r={self.block_size},"
+            f"p={self.parallelism}${_b64_encode(salt)}${_b64_encode(checksum)}"
+        )
 
-    def __init__(self, hashers: typing.List[Hasher]):
+    def verify_sync(self, secret: str, hashed: str) -> bool:
+        parsed = self._parse(hashed)
+        if parsed is None:
+            raise ValueError("hash could not be identified")
+        costs, salt, checksum = parsed
+        return hmac.compare_digest(
+            self._checksum(secret, salt, costs), checksum
+        )
+
+    def needs_update(self, hashed: str) -> bool:
+        parsed = self._parse(hashed)
+        return parsed is not None and parsed[0] != self._costs
+
+    def identify(self, hashed: str) -> bool:
+        # Like PassLib, only check the prefix: malformed hashes are
+        # reported when verifying them.
+        return hashed.startswith(self.ident)
+
+
+class MultiHasher(BaseHasher):
+    def __init__(
+        self,
+        hashers: typing.List[Hasher],
+        *,
+        dummy_hash: str = None,
+        **kwargs: typing.Any,
+    ):
+        super().__init__(**kwargs)
         if not hashers:
             raise ValueError("'hashers' should contain at least one hasher")
         self.hashers = hashers
         self._needs_update = None
-        self._dummy_hash = self.make_sync(self._dummy_secret)
+        # Both are computed on first use, as they require loading every
+        # hasher's backend and hashing a password, respectively.
+        self._index_cache: typing.Optional[
+            typing.Dict[str, typing.Tuple[int, Hasher]]
+        ] = None
+        self._dummy_hash_cache = dummy_hash
 
     @property
     def default_hasher(self) -> BaseHasher:
         return self.hashers[0]
 
+    @property
+    def _index(self) -> typing.Dict[str, typing.Tuple[int, Hasher]]:
+        if self._index_cache is None:
+            self._index_cache = self._build_index(self.hashers)
+        return self._index_cache
+
+    @property
+    def _dummy_hash(self) -> str:
+        if self._dummy_hash_cache is None:
+            self._dummy_hash_cache = self.make_sync(DUMMY_SECRET)
+        return self._dummy_hash_cache
+
+    async def prepare(self) -> str:
+        # Do the work deferred on init ahead of time, e.g. on startup.
+        # Returns the dummy hash, which may be passed as `dummy_hash`
+        # to skip computing it on next startups.
+        # Both are stored here rather than in the executor, as process pool
+        # workers only update their copy of the hasher.
+        if self._index_cache is None:
+            self._index_cache = self._build_index(self.hashers)
+        if self._dummy_hash_cache is None:
+            self._dummy_hash_cache = await self._run(
+                self.make_sync, DUMMY_SECRET
+            )
+        return self._dummy_hash_cache
+
     def make_sync(self, secret: str) -> str:
         return self.default_hasher.make_sync(secret)
 
-    def verify_sync(self, secret: str, hashed: str) -> bool:
-        self._needs_update = None
-
-        for hasher in self.hashers:
+    @staticmethod
+    def _build_index(
+        hashers: typing.List[Hasher]
+    ) -> typing.Dict[str, typing.Tuple[int, Hasher]]:
+        # Map hash prefixes to the hasher that `._identify()` would pick
+        # by scanning, so that most lookups don't need to scan.
+        index = {}
+        for hasher in hashers:
+            # Custom hashers may only implement `.identify()`: their hashes
+            # are then found by scanning.
+            for ident in getattr(hasher, "idents", ()):
+                if ident in index or _get_ident(ident) != ident:
+                    continue
+                for position, candidate in enumerate(hashers):
+                    if candidate.identify(ident):
+                        index[ident] = (position, candidate)
+                        break
+        return index
+
+    def _identify(
+        self, hashed: str
+    ) -> typing.Optional[typing.Tuple[int, Hasher]]:
+        ident = _get_ident(hashed)
+        if ident is not None:
+            match = self._index.get(ident)
+            if match is not None:
+                return match
+
+        for index, hasher in enumerate(self.hashers):
             if hasher.identify(hashed):
-                if self._needs_update is None:
-                    self._needs_update = hasher.needs_update(hashed)
-                return hasher.verify_sync(secret, hashed)
-            self._needs_update = True
+                return index, hasher
+        return None
+
+    def verify_and_update_sync(
+        self, secret: str, hashed: str
+    ) -> typing.Tuple[bool, bool]:
+        match = self._identify(hashed)
+
+        if match is None:
+            # Verify dummy password to reduce vulnerability to timing attacks.
+            self.default_hasher.verify_sync(
+                DUMMY_SECRET, self._dummy_hash
+            )
+            return False, False
 
-        # Verify dummy password to reduce vulnerability to timing attacks.
-        self.default_hasher.verify_sync(self._dummy_secret, self._dummy_hash)
+        index, hasher = match
+        if not hasher.verify_sync(secret, hashed):
+            return False, False
 
-        return False
+        # Hashes not made by the default hasher are always deprecated.
+        return True, index > 0 or hasher.needs_update(hashed)
+
+    async def verify(self, secret: str, hashed: str) -> bool:
+        # Store the state here rather than in the executor, as process pool
+        # workers would only update their copy of the hasher.
+        valid, self._needs_update = await self.verify_and_update(
+            secret, hashed
+        )
+        return valid
+
+    def verify_sync(self, secret: str, hashed: str) -> bool:
+        valid, self._needs_update = self.verify_and_update_sync(secret, hashed)
+        return valid
 
+    # NOTE: relies on state stored by `.verify()`, so it is not safe to use
+    # with concurrent verifications. Prefer `.verify_and_update()`.
     def needs_update(self, hashed: str) -> bool:
         if self._needs_update is None:
             raise RuntimeError(
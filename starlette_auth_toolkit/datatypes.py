@@ -3,3 +3,8 @@ import typing
 from starlette import authentication as auth
 
 AuthResult = typing.Optional[typing.Tuple[auth.AuthCredentials, auth.BaseUser]]
+
+
+class APIKey(typing.NamedTuple):
+    digest: str
+    user: auth.BaseUser
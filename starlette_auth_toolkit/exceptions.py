@@ -7,3 +7,19 @@ class InvalidCredentials(AuthenticationError):
         message: str = "Could not authenticate with the provided credentials",
     ):
         super().__init__(message)
+
+
+class ServiceUnavailable(AuthenticationError):
+    def __init__(
+        self,
+        message: str = "Too many authentication attempts, try again later",
+    ):
+        super().__init__(message)
+
+
+class TooManyAttempts(AuthenticationError):
+    def __init__(
+        self,
+        message: str = "Too many failed attempts, try again later",
+    ):
+        super().__init__(message)
@@ -0,0 +1,168 @@
+import bisect
+import typing
+
+_Labels = typing.Dict[str, str]
+_LabelsKey = typing.Tuple[typing.Tuple[str, str], ...]
+
+# Metrics reported by backends and hashers:
+# - auth_duration_seconds (backend, phase): phase is one of "parse",
+#   "authenticate", "lookup", "verify" or "rehash".
+# - auth_attempts_total (backend, outcome): outcome is one of "success",
+#   "failure", "skip" or "resume".
+# - hasher_duration_seconds (hasher, operation): operation is "make",
+#   "verify" or "verify_and_update". Includes time spent waiting for a worker.
+# - hasher_wait_seconds (hasher, operation): time spent waiting for a worker.
+AUTH_DURATION = "auth_duration_seconds"
+AUTH_ATTEMPTS = "auth_attempts_total"
+HASHER_DURATION = "hasher_duration_seconds"
+HASHER_WAIT = "hasher_wait_seconds"
+
+
+class Observer:
+    def observe(self, metric: str, value: float, labels: _Labels) -> None:
+        raise NotImplementedError
+
+    def increment(self, metric: str, labels: _Labels) -> None:
+        raise NotImplementedError
+
+
+class _Histogram:
+    def __init__(self, buckets: typing.Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+
+def _format_labels(labels: _LabelsKey, **extra: str) -> str:
+    items = [*labels, *extra.items()]
+    if not items:
+        return ""
+    content = ",".join(
+        '{}="{}"'.format(
+            name,
+            value.replace("\\", "\\\\")
+            .replace("\n", "\\n")
+            .replace('"', '\\"'),
+        )
+        for name, value in items
+    )
+    return f"{{{content}}}"
+
+
+# Keeps metrics in memory and renders them in the Prometheus text format,
+# e.g. to be served by a `/metrics` endpoint.
+class PrometheusObserver(Observer):
+    default_buckets = (
+        0.0005,
+        0.001,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+    )
+
+    def __init__(
+        self,
+        *,
+        namespace: str = "starlette_auth",
+        buckets: typing.Sequence[float] = None,
+    ):
+        self.namespace = namespace
+        self.buckets = tuple(
+            sorted(self.default_buckets if buckets is None else buckets)
+        )
+        self._histograms: typing.Dict[
+            str, typing.Dict[_LabelsKey, _Histogram]
+        ] = {}
+        self._counters: typing.Dict[str, typing.Dict[_LabelsKey, int]] = {}
+        self._caches: typing.Dict[str, typing.Any] = {}
+
+    def observe(self, metric: str, value: float, labels: _Labels) -> None:
+        histograms = self._histograms.setdefault(metric, {})
+        key = tuple(sorted(labels.items()))
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = _Histogram(self.buckets)
+        histogram.observe(value)
+
+    def increment(self, metric: str, labels: _Labels) -> None:
+        counters = self._counters.setdefault(metric, {})
+        key = tuple(sorted(labels.items()))
+        counters[key] = counters.get(key, 0) + 1
+
+    def register_cache(self, name: str, cache: typing.Any) -> None:
+        # Any object with `hits` and `misses` counters, e.g. caches
+        # from the `cache` module.
+        self._caches[name] = cache
+
+    def render(self) -> str:
+        lines = []
+
+        for metric, histograms in sorted(self._histograms.items()):
+            name = f"{self.namespace}_{metric}"
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in sorted(histograms.items()):
+                cumulative = 0
+                for bucket, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    bucket_labels = _format_labels(labels, le=repr(bucket))
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                inf_labels = _format_labels(labels, le="+Inf")
+                lines.append(f"{name}_bucket{inf_labels} {histogram.count}")
+                formatted = _format_labels(labels)
+                lines.append(f"{name}_sum{formatted} {histogram.sum}")
+                lines.append(f"{name}_count{formatted} {histogram.count}")
+
+        for metric, counters in sorted(self._counters.items()):
+            name = f"{self.namespace}_{metric}"
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in sorted(counters.items()):
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        if self._caches:
+            for counter in ("hits", "misses"):
+                name = f"{self.namespace}_cache_{counter}_total"
+                lines.append(f"# TYPE {name} counter")
+                for cache_name, cache in sorted(self._caches.items()):
+                    labels = _format_labels((("cache", cache_name),))
+                    lines.append(f"{name}{labels} {getattr(cache, counter)}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Forwards metrics to an OpenTelemetry meter (or any object with the same
+# `create_histogram()` and `create_counter()` methods).
+class OpenTelemetryObserver(Observer):
+    def __init__(self, meter: typing.Any, *, prefix: str = "starlette_auth."):
+        self.meter = meter
+        self.prefix = prefix
+        self._instruments: typing.Dict[str, typing.Any] = {}
+
+    def observe(self, metric: str, value: float, labels: _Labels) -> None:
+        histogram = self._instruments.get(metric)
+        if histogram is None:
+            name = self.prefix + metric
+            histogram = self.meter.create_histogram(name, unit="s")
+            self._instruments[metric] = histogram
+        histogram.record(value, attributes=labels)
+
+    def increment(self, metric: str, labels: _Labels) -> None:
+        counter = self._instruments.get(metric)
+        if counter is None:
+            counter = self.meter.create_counter(self.prefix + metric)
+            self._instruments[metric] = counter
+        counter.add(1, attributes=labels)
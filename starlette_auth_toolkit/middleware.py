@@ -0,0 +1,89 @@
+import re
+import typing
+
+from starlette.authentication import (
+    AuthCredentials,
+    AuthenticationError,
+    UnauthenticatedUser,
+)
+from starlette.requests import HTTPConnection
+from starlette.responses import PlainTextResponse, Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .base.backends import AuthBackend
+from .datatypes import AuthResult
+
+AUTH_RESULT_SCOPE_KEY = "starlette_auth_toolkit.auth_result"
+
+
+def _has_authorization(scope: Scope) -> bool:
+    return any(name == b"authorization" for name, _ in scope["headers"])
+
+
+# Drop-in replacement for Starlette's `AuthenticationMiddleware`.
+class AuthMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        backend: AuthBackend,
+        on_error: typing.Callable[
+            [HTTPConnection, AuthenticationError], Response
+        ] = None,
+        public_paths: typing.Sequence[str] = (),
+    ):
+        self.app = app
+        self.backend = backend
+        self.on_error = (
+            on_error if on_error is not None else self.default_on_error
+        )
+        self._authorization_only = getattr(
+            backend, "authorization_only", False
+        )
+        self._public_paths: typing.Optional[typing.Pattern] = None
+        if public_paths:
+            self._public_paths = re.compile(
+                "|".join(f"(?:{pattern})" for pattern in public_paths)
+            )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        auth_result = scope.get(AUTH_RESULT_SCOPE_KEY)
+
+        if auth_result is None:
+            try:
+                auth_result = await self.authenticate(scope)
+            except AuthenticationError as exc:
+                conn = HTTPConnection(scope)
+                response = self.on_error(conn, exc)
+                if scope["type"] == "websocket":
+                    await send({"type": "websocket.close", "code": 1000})
+                else:
+                    await response(scope, receive, send)
+                return
+
+            scope[AUTH_RESULT_SCOPE_KEY] = auth_result
+
+        scope["auth"], scope["user"] = auth_result
+        await self.app(scope, receive, send)
+
+    async def authenticate(self, scope: Scope) -> AuthResult:
+        if (
+            self._public_paths is not None
+            and self._public_paths.fullmatch(scope["path"]) is not None
+        ):
+            return AuthCredentials(), UnauthenticatedUser()
+
+        if self._authorization_only and not _has_authorization(scope):
+            return AuthCredentials(), UnauthenticatedUser()
+
+        auth_result = await self.backend.authenticate(HTTPConnection(scope))
+        if auth_result is None:
+            return AuthCredentials(), UnauthenticatedUser()
+        return auth_result
+
+    @staticmethod
+    def default_on_error(conn: HTTPConnection, exc: Exception) -> Response:
+        return PlainTextResponse(str(exc), status_code=400)
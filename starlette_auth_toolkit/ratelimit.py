@@ -0,0 +1,101 @@
+import time
+import typing
+
+
+# Stores, for each key, the time at which its limit is fully reset.
+# Keys may be forgotten once that time has passed, which is what makes
+# it possible to implement stores on top of key-value stores with expiry.
+class RateLimitStore:
+    async def get(self, key: str) -> typing.Optional[float]:
+        raise NotImplementedError
+
+    async def set(self, key: str, reset_at: float) -> None:
+        raise NotImplementedError
+
+
+class MemoryStore(RateLimitStore):
+    def __init__(
+        self,
+        *,
+        sweep_interval: float = 60,
+        timer: typing.Callable[[], float] = time.time,
+    ):
+        self.sweep_interval = sweep_interval
+        self._timer = timer
+        self._reset_times: typing.Dict[str, float] = {}
+        self._next_sweep = timer() + sweep_interval
+
+    def __len__(self) -> int:
+        return len(self._reset_times)
+
+    async def get(self, key: str) -> typing.Optional[float]:
+        return self._reset_times.get(key)
+
+    async def set(self, key: str, reset_at: float) -> None:
+        self._reset_times[key] = reset_at
+
+        now = self._timer()
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            self._reset_times = {
+                key: reset_at
+                for key, reset_at in self._reset_times.items()
+                if reset_at > now
+            }
+
+
+# Allows `limit` hits per `period`, using the generic cell rate algorithm
+# (GCRA), which only needs to store a single timestamp per key.
+class RateLimiter:
+    def __init__(
+        self,
+        limit: int,
+        period: float,
+        *,
+        store: RateLimitStore = None,
+        timer: typing.Callable[[], float] = time.time,
+    ):
+        if limit <= 0:
+            raise ValueError("'limit' must be a positive integer")
+        self.limit = limit
+        self.period = period
+        self.store = MemoryStore(timer=timer) if store is None else store
+        self._timer = timer
+        self._interval = period / limit
+        # Allow for rounding errors when summing intervals.
+        self._tolerance = period - self._interval + period * 1e-9
+
+    async def is_limited(self, key: str) -> bool:
+        reset_at = await self.store.get(key)
+        if reset_at is None:
+            return False
+        return reset_at - self._timer() > self._tolerance
+
+    async def hit(self, key: str) -> None:
+        now = self._timer()
+        reset_at = await self.store.get(key)
+        if reset_at is None or reset_at < now:
+            reset_at = now
+        await self.store.set(key, reset_at + self._interval)
+
+    # Checks and hits in one step, so that concurrent callers can't all
+    # pass the check before any of them hits. Returns whether the hit
+    # was allowed. (This is atomic with `MemoryStore`, whose methods never
+    # suspend; shared stores should make `get()` + `set()` atomic.)
+    async def acquire(self, key: str) -> bool:
+        now = self._timer()
+        reset_at = await self.store.get(key)
+        if reset_at is None or reset_at < now:
+            reset_at = now
+        if reset_at - now > self._tolerance:
+            return False
+        await self.store.set(key, reset_at + self._interval)
+        return True
+
+    # Gives back a hit made by `acquire()`, e.g. once an attempt succeeded.
+    async def refund(self, key: str) -> None:
+        reset_at = await self.store.get(key)
+        if reset_at is None:
+            return
+        reset_at = max(reset_at - self._interval, self._timer())
+        await self.store.set(key, reset_at)
@@ -0,0 +1,128 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+import typing
+
+_Key = typing.Union[str, bytes]
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _to_bytes(key: _Key) -> bytes:
+    return key.encode("utf-8") if isinstance(key, str) else key
+
+
+# Signs and verifies self-contained tokens, in the format of JSON Web Tokens
+# signed with HMAC-SHA256 (HS256).
+# Tokens are signed with the first key, and verified with any of the keys,
+# which allows rotating keys without invalidating existing tokens.
+class Signer:
+    algorithm = "HS256"
+
+    def __init__(
+        self,
+        keys: typing.Sequence[_Key],
+        *,
+        expires_in: typing.Optional[float] = 3600,
+        leeway: float = 0,
+        issuer: str = None,
+        audience: str = None,
+        timer: typing.Callable[[], float] = time.time,
+    ):
+        if not keys:
+            raise ValueError("'keys' should contain at least one key")
+        self.expires_in = expires_in
+        self.leeway = leeway
+        self.issuer = issuer
+        self.audience = audience
+        self._timer = timer
+
+        # Encoded headers are precomputed, and used to find the key
+        # of a token without decoding its header.
+        self._keys: typing.Dict[str, bytes] = {}
+        for key in map(_to_bytes, keys):
+            kid = hashlib.sha256(key).hexdigest()[:8]
+            header = {"alg": self.algorithm, "kid": kid, "typ": "JWT"}
+            encoded_header = _b64encode(
+                json.dumps(header, separators=(",", ":")).encode("utf-8")
+            )
+            self._keys.setdefault(encoded_header, key)
+        self._signing_header = next(iter(self._keys))
+
+    @staticmethod
+    def _sign(key: bytes, message: str) -> bytes:
+        return hmac.new(key, message.encode("ascii"), hashlib.sha256).digest()
+
+    def dumps(
+        self,
+        claims: typing.Dict[str, typing.Any],
+        *,
+        expires_in: typing.Optional[float] = None,
+    ) -> str:
+        now = self._timer()
+        claims = {"iat": int(now), **claims}
+        if expires_in is None:
+            expires_in = self.expires_in
+        if expires_in is not None:
+            claims.setdefault("exp", int(now + expires_in))
+        if self.issuer is not None:
+            claims.setdefault("iss", self.issuer)
+        if self.audience is not None:
+            claims.setdefault("aud", self.audience)
+
+        payload = _b64encode(
+            json.dumps(claims, separators=(",", ":")).encode("utf-8")
+        )
+        message = f"{self._signing_header}.{payload}"
+        key = self._keys[self._signing_header]
+        return f"{message}.{_b64encode(self._sign(key, message))}"
+
+    def loads(
+        self, token: str
+    ) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        header, _, rest = token.partition(".")
+        key = self._keys.get(header)
+        if key is None:
+            return None
+
+        payload, _, signature = rest.partition(".")
+        try:
+            expected = _b64encode(self._sign(key, f"{header}.{payload}"))
+        except UnicodeEncodeError:
+            return None
+        if not hmac.compare_digest(
+            signature.encode("utf-8"), expected.encode("ascii")
+        ):
+            return None
+
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            return None
+        if not isinstance(claims, dict):
+            return None
+
+        if not self.validate(claims):
+            return None
+
+        return claims
+
+    def validate(self, claims: typing.Dict[str, typing.Any]) -> bool:
+        now = self._timer()
+        if "exp" in claims and now >= claims["exp"] + self.leeway:
+            return False
+        if "nbf" in claims and now < claims["nbf"] - self.leeway:
+            return False
+        if self.issuer is not None and claims.get("iss") != self.issuer:
+            return False
+        if self.audience is not None and claims.get("aud") != self.audience:
+            return False
+        return True
@@ -0,0 +1,69 @@
+import asyncio
+import statistics
+import typing
+
+from .cryptography import DUMMY_SECRET, BaseHasher, timed
+
+
+# Makes failed lookups of unknown users take about as long as verifying
+# a password, so that response times don't reveal which usernames exist.
+class TimingStrategy:
+    async def on_unknown_user(self, password: str) -> None:
+        raise NotImplementedError
+
+
+# Verifies the password against a dummy hash, using the hasher's executor
+# and limiter. Most accurate, but costs as much CPU as a real verification.
+class DummyVerification(TimingStrategy):
+    def __init__(self, hasher: BaseHasher, *, dummy_hash: str = None):
+        self.hasher = hasher
+        self.dummy_hash = dummy_hash
+        self._dummy_hash_future: typing.Optional[asyncio.Future] = None
+
+    async def prepare(self) -> str:
+        # Compute the dummy hash ahead of time, e.g. on startup, so that
+        # the first unknown username isn't slower than the next ones.
+        # Concurrent callers share a single computation.
+        if self.dummy_hash is not None:
+            return self.dummy_hash
+
+        if self._dummy_hash_future is None:
+            self._dummy_hash_future = asyncio.ensure_future(
+                self.hasher.make(DUMMY_SECRET)
+            )
+        future = self._dummy_hash_future
+        try:
+            self.dummy_hash = await asyncio.shield(future)
+        except Exception:
+            if self._dummy_hash_future is future:
+                self._dummy_hash_future = None  # Retry on next call.
+            raise
+        return self.dummy_hash
+
+    async def on_unknown_user(self, password: str) -> None:
+        dummy_hash = await self.prepare()
+        await self.hasher.verify(password, dummy_hash)
+
+
+# Sleeps for a fixed time, which costs no CPU: probing usernames
+# can't be used to exhaust the hashing workers.
+class ConstantDelay(TimingStrategy):
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    @classmethod
+    def calibrate(
+        cls, hasher: BaseHasher, *, samples: int = 5
+    ) -> "ConstantDelay":
+        # Use the median time of verifying a password on the current host.
+        hashed = hasher.make_sync("calibration")
+        delay = statistics.median(
+            timed(hasher.verify_sync, "calibration", hashed)
+            for _ in range(samples)
+        )
+        return cls(delay)
+
+    async def on_unknown_user(
+        self, password: str  # pylint: disable=unused-argument
+    ) -> None:
+        await asyncio.sleep(self.delay)
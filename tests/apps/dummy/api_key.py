@@ -0,0 +1,30 @@
+from starlette.authentication import SimpleUser
+
+from starlette_auth_toolkit.base.backends import BaseAPIKeyAuth
+from starlette_auth_toolkit.cache import CredentialsCache
+from starlette_auth_toolkit.cryptography import HMACHasher
+from starlette_auth_toolkit.datatypes import APIKey
+
+from ..utils import get_base_app
+
+
+class APIKeyAuth(BaseAPIKeyAuth):
+    key_hasher = HMACHasher("p3pp3r")
+
+    def __init__(self):
+        self.key_cache = CredentialsCache()
+        self.keys = {}
+        self.lookups = 0
+
+    async def find_key(self, prefix: str):
+        self.lookups += 1
+        return self.keys.get(prefix)
+
+    def add_key(self, username: str) -> str:
+        key, prefix, digest = self.create_key()
+        self.keys[prefix] = APIKey(digest=digest, user=SimpleUser(username))
+        return key
+
+
+def get_app(backend: APIKeyAuth):
+    return get_base_app(backend=backend)
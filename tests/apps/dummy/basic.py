@@ -8,13 +8,14 @@ from ..utils import get_base_app
 
 USERNAME = "user"
 PASSWORD = "s3kr3t"
+CREDENTIALS = {(USERNAME, PASSWORD), ("jürgen", "pass:with:colons")}
 
 
 class BasicAuth(backends.BaseBasicAuth):
     async def verify(
         self, username: str, password: str
     ) -> typing.Optional[SimpleUser]:
-        if (username, password) == (USERNAME, PASSWORD):
+        if (username, password) in CREDENTIALS:
             return SimpleUser(username)
         return None
 
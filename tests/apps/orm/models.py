@@ -42,7 +42,7 @@ class Token(orm.Model):
     __metadata__ = metadata
 
     id = orm.Integer(primary_key=True)
-    token = orm.String(max_length=256)
+    digest = orm.String(max_length=64, index=True)
     user = orm.ForeignKey(to=User, allow_null=False)
 
 
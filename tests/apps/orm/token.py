@@ -1,6 +1,3 @@
-import typing
-
-import orm
 import typesystem
 from starlette.applications import Starlette
 from starlette.exceptions import HTTPException
@@ -8,24 +5,15 @@ from starlette.requests import Request
 from starlette.responses import JSONResponse
 
 from starlette_auth_toolkit.backends import MultiAuth
-from starlette_auth_toolkit.base.backends import BaseTokenAuth
-from starlette_auth_toolkit.contrib.orm import ModelBasicAuth
-from starlette_auth_toolkit.cryptography import generate_random_string
+from starlette_auth_toolkit.cache import TTLCache
+from starlette_auth_toolkit.contrib.orm import ModelBasicAuth, ModelTokenAuth
 
 from ..utils import get_base_app
 from .models import Token, User, database
 from .resources import hasher
 
-basic_auth = ModelBasicAuth(User, hasher=hasher)
-
-
-class TokenAuth(BaseTokenAuth):
-    async def verify(self, token: str) -> typing.Optional[User]:
-        try:
-            token = await Token.objects.select_related("user").get(token=token)
-        except orm.NoMatch:
-            return None
-        return token.user
+basic_auth = ModelBasicAuth(User, hasher=hasher, batch_lookups=True)
+token_auth = ModelTokenAuth(Token, cache=TTLCache(ttl=60))
 
 
 class UserCredentials(typesystem.Schema):
@@ -34,7 +22,7 @@ class UserCredentials(typesystem.Schema):
 
 
 def get_app() -> Starlette:
-    app = get_base_app(backend=MultiAuth([TokenAuth(), basic_auth]))
+    app = get_base_app(backend=MultiAuth([token_auth, basic_auth]))
 
     @app.route("/users", methods=["post"])
     async def create_user(request: Request):
@@ -54,14 +42,13 @@ def get_app() -> Starlette:
         if user is None:
             raise HTTPException(401)
 
-        try:
-            token = await Token.objects.get(user=user)
-        except orm.NoMatch:
-            token = await Token.objects.create(
-                token=generate_random_string(size=32), user=user
-            )
+        token = await token_auth.create_token(user)
+        return JSONResponse({"token": token}, status_code=201)
 
-        return JSONResponse({"token": token.token}, status_code=201)
+    @app.route("/tokens/revoke", methods=["post"])
+    async def revoke_token(request: Request):
+        await token_auth.revoke_token((await request.json())["token"])
+        return JSONResponse({})
 
     app.add_event_handler("startup", database.connect)
     app.add_event_handler("shutdown", database.disconnect)
@@ -0,0 +1,42 @@
+import pytest
+from starlette.testclient import TestClient
+
+from .apps.dummy.api_key import APIKeyAuth, get_app
+
+
+@pytest.fixture(name="backend")
+def fixture_backend():
+    return APIKeyAuth()
+
+
+@pytest.fixture(name="client")
+def fixture_client(backend):
+    return TestClient(get_app(backend))
+
+
+def test_auth(client, backend):
+    key = backend.add_key("bob")
+    prefix, _, secret = key.partition(".")
+    assert len(prefix) == backend.prefix_size
+    assert len(secret) == backend.secret_size
+    assert backend.keys[prefix].digest != secret
+
+    for _ in range(2):
+        r = client.get("/", headers={"Authorization": f"Api-Key {key}"})
+        assert r.status_code == 200
+    assert backend.lookups == 1
+
+
+@pytest.mark.parametrize(
+    "credentials", ["doesnotexist", "doesnot.exist", ".", "{prefix}.wrong"]
+)
+def test_invalid_key(client, backend, credentials):
+    prefix = backend.add_key("bob").partition(".")[0]
+    headers = {"Authorization": f"Api-Key {credentials.format(prefix=prefix)}"}
+    r = client.get("/", headers=headers)
+    assert r.status_code == 401
+
+
+def test_no_key(client):
+    r = client.get("/")
+    assert r.status_code == 403
@@ -1,3 +1,5 @@
+import base64
+
 import pytest
 from starlette.testclient import TestClient
 
@@ -27,8 +29,23 @@ def test_basic_auth(client, username, password, status_code):
     assert r.status_code == status_code
 
 
+def test_unicode_and_colons(client):
+    credentials = base64.b64encode("jürgen:pass:with:colons".encode("utf-8"))
+    headers = {"Authorization": f"Basic {credentials.decode()}"}
+    r = client.get("/", headers=headers)
+    assert r.status_code == 200
+
+
 @pytest.mark.parametrize(
-    "authorization", ["Basic userpass", "Basic user:pass:withcolon"]
+    "authorization",
+    [
+        "Basic userpass",
+        "Basic user:pass:withcolon",
+        f"Basic {base64.b64encode(b'nocolon').decode()}",
+        f"Basic {base64.b64encode(b'user:pass').decode()}!",
+        f"Basic {base64.b64encode(bytes([0xff, 0x3a])).decode()}",
+        f"Basic {base64.b64encode(b'user:' + b'a' * 1024).decode()}",
+    ],
 )
 def test_malformed_credentials(client, authorization):
     r = client.get("/", headers={"Authorization": authorization})
@@ -3,6 +3,7 @@ from starlette.authentication import SimpleUser, AuthCredentials
 from starlette.testclient import TestClient
 
 from starlette_auth_toolkit.backends import MultiAuth
+from starlette_auth_toolkit.base.backends import BaseTokenAuth
 from starlette_auth_toolkit.exceptions import InvalidCredentials
 
 from .apps.utils import get_base_app
@@ -55,3 +56,43 @@ def fixture_client():
 def test_auth(client, headers, status_code):
     r = client.get("/", headers=headers)
     assert r.status_code == status_code
+
+
+class CountingTokenAuth(BaseTokenAuth):
+    def __init__(self, scheme: str):
+        self.scheme = scheme
+        self.calls = 0
+
+    async def verify(self, token: str):
+        self.calls += 1
+        return SimpleUser("bob") if token == "t0k3n" else None
+
+
+def test_scheme_dispatch():
+    token_a = CountingTokenAuth(scheme="A")
+    token_b = CountingTokenAuth(scheme="B")
+    client = TestClient(
+        get_base_app(
+            backend=MultiAuth(
+                [
+                    token_a,
+                    DummyHeaderBackend(header="X-Auth-A", value="A"),
+                    token_b,
+                ]
+            )
+        )
+    )
+
+    r = client.get("/", headers={"Authorization": "b t0k3n"})
+    assert r.status_code == 200
+    assert (token_a.calls, token_b.calls) == (0, 1)
+
+    r = client.get("/", headers={"Authorization": "A wrong"})
+    assert r.status_code == 401
+    assert (token_a.calls, token_b.calls) == (1, 1)
+
+    r = client.get(
+        "/", headers={"Authorization": "Other t0k3n", "X-Auth-A": "A"}
+    )
+    assert r.status_code == 200
+    assert (token_a.calls, token_b.calls) == (1, 1)
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from starlette_auth_toolkit.batching import BatchLoader
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeStore:
+    def __init__(self):
+        self.calls = []
+
+    async def load_many(self, keys):
+        self.calls.append(keys)
+        await asyncio.sleep(0)
+        return {key: key.upper() for key in keys if key != "missing"}
+
+
+async def test_batch_loader():
+    store = FakeStore()
+    loader = BatchLoader(store.load_many)
+
+    values = await asyncio.gather(
+        *(loader.load(key) for key in ["a", "b", "a", "missing"])
+    )
+    assert values == ["A", "B", "A", None]
+    assert store.calls == [["a", "b", "missing"]]
+
+    assert await loader.load("c") == "C"
+    assert loader.batches == 2
+
+
+async def test_batch_loader_max_batch_size():
+    store = FakeStore()
+    loader = BatchLoader(store.load_many, max_batch_size=2)
+
+    values = await asyncio.gather(*(loader.load(key) for key in "abcde"))
+    assert values == list("ABCDE")
+    assert store.calls == [["a", "b"], ["c", "d"], ["e"]]
+
+
+async def test_batch_loader_wait():
+    store = FakeStore()
+    loader = BatchLoader(store.load_many, wait=0.01)
+
+    async def load_later(key):
+        await asyncio.sleep(0.001)
+        return await loader.load(key)
+
+    values = await asyncio.gather(loader.load("a"), load_later("b"))
+    assert values == ["A", "B"]
+    assert store.calls == [["a", "b"]]
+
+
+async def test_batch_loader_error():
+    async def load_many(keys):
+        raise RuntimeError
+
+    loader = BatchLoader(load_many)
+    results = await asyncio.gather(
+        loader.load("a"),
+        loader.load("b"),
+        return_exceptions=True,
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+async def test_batch_loaders_are_independent():
+    users, groups = FakeStore(), FakeStore()
+    user_loader = BatchLoader(users.load_many)
+    group_loader = BatchLoader(groups.load_many)
+
+    values = await asyncio.gather(
+        user_loader.load("a"), group_loader.load("b"), user_loader.load("c")
+    )
+    assert values == ["A", "B", "C"]
+    assert users.calls == [["a", "c"]]
+    assert groups.calls == [["b"]]
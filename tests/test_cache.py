@@ -0,0 +1,188 @@
+import asyncio
+import base64
+
+import pytest
+from starlette.authentication import SimpleUser
+from starlette.requests import HTTPConnection
+
+from starlette_auth_toolkit.base.backends import BaseBasicAuth
+from starlette_auth_toolkit.cache import (
+    CredentialsCache,
+    LookupCache,
+    ScopesCache,
+    TTLCache,
+)
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(name="timer")
+def fixture_timer():
+    return FakeTimer()
+
+
+def test_ttl_cache_expiry(timer):
+    cache = TTLCache(max_size=10, ttl=5, timer=timer)
+    cache.set("foo", 1)
+    assert cache.get("foo") == 1
+    timer.now = 5
+    assert cache.get("foo") is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_ttl_cache_lru_eviction(timer):
+    cache = TTLCache(max_size=2, ttl=5, timer=timer)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_credentials_cache(timer):
+    cache = CredentialsCache(ttl=5, timer=timer)
+    user = SimpleUser("bob")
+    cache.set("bob", "s3kr3t", user)
+    assert cache.get("bob", "s3kr3t") is user
+    assert cache.get("bob", "wrong") is None
+    assert cache.get("alice", "s3kr3t") is None
+
+    cache.invalidate("bob")
+    assert cache.get("bob", "s3kr3t") is None
+
+
+class CountingBasicAuth(BaseBasicAuth):
+    def __init__(self):
+        self.credentials_cache = CredentialsCache()
+        self.verifications = 0
+
+    async def find_user(self, username: str):
+        return SimpleUser(username) if username == "bob" else None
+
+    async def verify_password(self, user, password: str) -> bool:
+        self.verifications += 1
+        return password == "s3kr3t"
+
+
+@pytest.mark.asyncio
+async def test_basic_auth_caches_successes_only():
+    backend = CountingBasicAuth()
+
+    assert await backend.verify("bob", "wrong") is None
+    assert await backend.verify("bob", "wrong") is None
+    assert backend.verifications == 2
+
+    user = await backend.verify("bob", "s3kr3t")
+    assert await backend.verify("bob", "s3kr3t") is user
+    assert backend.verifications == 3
+
+
+@pytest.mark.asyncio
+async def test_lookup_cache(timer):
+    cache = LookupCache(ttl=60, negative_ttl=5, timer=timer)
+    users = {"bob": SimpleUser("bob")}
+    loads = []
+
+    async def load(username: str):
+        loads.append(username)
+        await asyncio.sleep(0)
+        return users.get(username)
+
+    results = await asyncio.gather(
+        cache.get("bob", load), cache.get("bob", load), cache.get("foo", load)
+    )
+    assert results == [users["bob"], users["bob"], None]
+    assert loads == ["bob", "foo"]
+
+    assert await cache.get("foo", load) is None
+    assert loads == ["bob", "foo"]
+
+    # Unknown keys are remembered for a shorter time.
+    timer.now = 5
+    assert await cache.get("bob", load) is users["bob"]
+    assert await cache.get("foo", load) is None
+    assert loads == ["bob", "foo", "foo"]
+
+    cache.invalidate("bob")
+    assert await cache.get("bob", load) is users["bob"]
+    assert loads == ["bob", "foo", "foo", "bob"]
+
+
+class User:
+    def __init__(self, pk: int, name: str, role: str, version: int = 0):
+        self.id = pk  # pylint: disable=invalid-name
+        self.display_name = name
+        self.role = role
+        self.version = version
+
+
+class ScopesBasicAuth(BaseBasicAuth):
+    def __init__(self, users):
+        self.users = {user.display_name: user for user in users}
+        self.scopes_cache = ScopesCache(
+            key=lambda user: user.id, version=lambda user: user.version
+        )
+        self.scope_lookups = 0
+
+    async def find_user(self, username: str):
+        return self.users.get(username)
+
+    async def verify_password(self, user, password: str) -> bool:
+        return True
+
+    async def get_scopes(self, user):
+        self.scope_lookups += 1
+        return ["authenticated", user.role]
+
+
+@pytest.mark.asyncio
+async def test_scopes_cache():
+    alice, bob = User(1, "alice", "admin"), User(2, "bob", "admin")
+    backend = ScopesBasicAuth([alice, bob])
+
+    for username in ("alice", "alice", "bob"):
+        credentials = base64.b64encode(f"{username}:pass".encode()).decode()
+        scheme_credentials, user = await backend.authenticate_credentials(
+            HTTPConnection({"type": "http", "headers": []}), credentials
+        )
+        assert sorted(scheme_credentials.scopes) == ["admin", "authenticated"]
+    assert backend.scope_lookups == 2
+
+    cache = backend.scopes_cache
+    # Equal scope sets are shared.
+    assert await cache.get(alice, backend.get_scopes) is await cache.get(
+        bob, backend.get_scopes
+    )
+
+    alice.role, alice.version = "member", 1
+    assert await cache.get(alice, backend.get_scopes) == {
+        "authenticated",
+        "member",
+    }
+    assert backend.scope_lookups == 3
+
+    bob.role = "member"
+    cache.invalidate(bob)
+    assert "member" in await cache.get(bob, backend.get_scopes)
+    assert (cache.hits, cache.misses) == (3, 4)
+
+
+@pytest.mark.asyncio
+async def test_scopes_cache_key():
+    cache = ScopesCache(key=lambda user: user.id)
+    admin, member = User(1, "bob", "admin"), User(2, "bob", "member")
+
+    async def load(user):
+        return [user.role]
+
+    assert await cache.get(admin, load) == {"admin"}
+    assert await cache.get(member, load) == {"member"}
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from starlette_auth_toolkit.concurrency import ConcurrencyLimiter
+from starlette_auth_toolkit.cryptography import BaseHasher
+from starlette_auth_toolkit.exceptions import ServiceUnavailable
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_limiter_queues_then_rejects():
+    limiter = ConcurrencyLimiter(max_concurrency=1, max_waiting=1)
+    release = asyncio.Event()
+
+    async def work():
+        async with limiter:
+            await release.wait()
+
+    first = asyncio.ensure_future(work())
+    second = asyncio.ensure_future(work())
+    await asyncio.sleep(0)
+    assert (limiter.active, limiter.waiting) == (1, 1)
+
+    with pytest.raises(ServiceUnavailable):
+        await work()
+
+    release.set()
+    await asyncio.gather(first, second)
+    assert limiter.stats() == {
+        "active": 0,
+        "waiting": 0,
+        "admitted": 2,
+        "rejected": 1,
+    }
+
+
+async def test_limiter_cancelled_waiter():
+    limiter = ConcurrencyLimiter(max_concurrency=1, max_waiting=1)
+    await limiter.acquire()
+
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert limiter.waiting == 0
+
+    limiter.release()
+    assert limiter.active == 0
+
+
+async def test_limiter_release_before_cancelled_waiter_resumes():
+    limiter = ConcurrencyLimiter(max_concurrency=1, max_waiting=1)
+    await limiter.acquire()
+
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    limiter.release()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert limiter.waiting == 0
+    assert limiter.active == 0
+
+
+class PlainHasher(BaseHasher):
+    def make_sync(self, secret: str) -> str:
+        return secret
+
+    def verify_sync(self, secret: str, hashed: str) -> bool:
+        return secret == hashed
+
+
+async def test_hasher_limiter():
+    limiter = ConcurrencyLimiter(max_concurrency=2)
+    hasher = PlainHasher(limiter=limiter)
+    assert await hasher.verify("hello", "hello")
+    assert limiter.admitted == 1
+    assert limiter.active == 0
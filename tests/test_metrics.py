@@ -0,0 +1,159 @@
+import pickle
+
+import pytest
+from starlette.authentication import SimpleUser
+from starlette.testclient import TestClient
+
+from starlette_auth_toolkit.backends import MultiAuth
+from starlette_auth_toolkit.base.backends import BaseBasicAuth, BaseTokenAuth
+from starlette_auth_toolkit.cache import CredentialsCache
+from starlette_auth_toolkit.cryptography import PBKDF2Hasher
+from starlette_auth_toolkit.metrics import (
+    AUTH_ATTEMPTS,
+    AUTH_DURATION,
+    HASHER_DURATION,
+    HASHER_WAIT,
+    OpenTelemetryObserver,
+    PrometheusObserver,
+)
+
+from .apps.utils import get_base_app
+
+
+class RecordingObserver(PrometheusObserver):
+    def __init__(self):
+        super().__init__()
+        self.observed = []
+        self.counted = []
+
+    def observe(self, metric, value, labels):
+        super().observe(metric, value, labels)
+        self.observed.append((metric, labels))
+
+    def increment(self, metric, labels):
+        super().increment(metric, labels)
+        self.counted.append((metric, labels))
+
+
+class BasicAuth(BaseBasicAuth):
+    def __init__(self, observer):
+        self.observer = observer
+        self.credentials_cache = CredentialsCache()
+
+    async def find_user(self, username: str):
+        return SimpleUser(username) if username == "bob" else None
+
+    async def verify_password(self, user, password: str) -> bool:
+        return password == "s3kr3t"
+
+
+class TokenAuth(BaseTokenAuth):
+    async def verify(self, token: str):
+        return SimpleUser("bob") if token == "t0k3n" else None
+
+
+def test_backend_metrics():
+    observer = RecordingObserver()
+    backend = BasicAuth(observer)
+    client = TestClient(get_base_app(backend=backend))
+
+    r = client.get("/", auth=("bob", "s3kr3t"))
+    assert r.status_code == 200
+    r = client.get("/", auth=("bob", "wrong"))
+    assert r.status_code == 401
+    r = client.get("/")
+    assert r.status_code == 403
+
+    phases = [
+        labels["phase"]
+        for metric, labels in observer.observed
+        if metric == AUTH_DURATION
+    ]
+    assert phases.count("lookup") == 2
+    assert phases.count("verify") == 2
+    assert phases.count("authenticate") == 2
+    assert phases.count("parse") == 3
+
+    outcomes = [labels["outcome"] for _, labels in observer.counted]
+    assert outcomes == ["success", "failure", "skip"]
+
+    observer.register_cache("credentials", backend.credentials_cache)
+    output = observer.render()
+    assert (
+        'starlette_auth_auth_attempts_total{backend="BasicAuth",'
+        'outcome="success"} 1'
+    ) in output
+    assert (
+        'starlette_auth_auth_duration_seconds_count{backend="BasicAuth",'
+        'phase="verify"} 2'
+    ) in output
+    assert 'starlette_auth_cache_misses_total{cache="credentials"} 2' in output
+
+
+def test_multi_auth_metrics():
+    observer = RecordingObserver()
+    backend = MultiAuth([TokenAuth()], observer=observer)
+    client = TestClient(get_base_app(backend=backend))
+
+    r = client.get("/", headers={"Authorization": "Token t0k3n"})
+    assert r.status_code == 200
+    r = client.get("/", headers={"Authorization": "Basic foo"})
+    assert r.status_code == 403
+
+    assert observer.counted == [
+        (AUTH_ATTEMPTS, {"backend": "MultiAuth", "outcome": "success"}),
+        (AUTH_ATTEMPTS, {"backend": "MultiAuth", "outcome": "skip"}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_hasher_metrics():
+    observer = RecordingObserver()
+    hasher = PBKDF2Hasher(observer=observer)
+
+    hashed = await hasher.make("s3kr3t")
+    assert await hasher.verify("s3kr3t", hashed)
+
+    assert observer.observed == [
+        (HASHER_WAIT, {"hasher": "PBKDF2Hasher", "operation": "make"}),
+        (HASHER_DURATION, {"hasher": "PBKDF2Hasher", "operation": "make"}),
+        (HASHER_WAIT, {"hasher": "PBKDF2Hasher", "operation": "verify"}),
+        (HASHER_DURATION, {"hasher": "PBKDF2Hasher", "operation": "verify"}),
+    ]
+    assert pickle.loads(pickle.dumps(hasher)).observer is None
+
+
+class FakeInstrument:
+    def __init__(self):
+        self.values = []
+
+    def record(self, value, attributes):
+        self.values.append((value, attributes))
+
+    def add(self, value, attributes):
+        self.values.append((value, attributes))
+
+
+class FakeMeter:
+    def __init__(self):
+        self.instruments = {}
+
+    def create_histogram(self, name, unit=""):  # pylint: disable=W0613
+        return self.instruments.setdefault(name, FakeInstrument())
+
+    def create_counter(self, name):
+        return self.instruments.setdefault(name, FakeInstrument())
+
+
+def test_opentelemetry_observer():
+    meter = FakeMeter()
+    observer = OpenTelemetryObserver(meter)
+
+    observer.observe(AUTH_DURATION, 0.5, {"phase": "verify"})
+    observer.increment(AUTH_ATTEMPTS, {"outcome": "success"})
+    observer.increment(AUTH_ATTEMPTS, {"outcome": "success"})
+
+    histogram = meter.instruments["starlette_auth.auth_duration_seconds"]
+    assert histogram.values == [(0.5, {"phase": "verify"})]
+    counter = meter.instruments["starlette_auth.auth_attempts_total"]
+    assert len(counter.values) == 2
@@ -0,0 +1,84 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.authentication import requires
+from starlette.responses import PlainTextResponse
+from starlette.testclient import TestClient
+
+from starlette_auth_toolkit.backends import MultiAuth
+from starlette_auth_toolkit.middleware import AuthMiddleware
+
+from .apps.dummy.token import TOKEN, TokenAuth
+from .test_auth_multi import DummyHeaderBackend
+
+
+class CountingMultiAuth(MultiAuth):
+    def __init__(self, backends):
+        super().__init__(backends)
+        self.calls = 0
+
+    async def authenticate(self, conn):
+        self.calls += 1
+        return await super().authenticate(conn)
+
+
+def get_app(backend) -> Starlette:
+    app = Starlette()
+    app.add_middleware(
+        AuthMiddleware,
+        backend=backend,
+        on_error=lambda _, exc: PlainTextResponse(str(exc), status_code=401),
+        public_paths=[r"/public/.*"],
+    )
+
+    @app.route("/")
+    @requires("authenticated", status_code=403)
+    async def home(request):  # pylint: disable=unused-argument
+        return PlainTextResponse("Hello, world!")
+
+    @app.route("/public/{path:path}")
+    async def public(request):
+        return PlainTextResponse(str(request.user.is_authenticated))
+
+    return app
+
+
+@pytest.mark.parametrize(
+    "headers, status_code",
+    [
+        ({"Authorization": f"Token {TOKEN}"}, 200),
+        ({"Authorization": "Token wrong"}, 401),
+        ({"Authorization": f"Other {TOKEN}"}, 403),
+        ({}, 403),
+    ],
+)
+def test_auth(headers, status_code):
+    client = TestClient(get_app(TokenAuth()))
+    r = client.get("/", headers=headers)
+    assert r.status_code == status_code
+
+
+def test_public_paths():
+    backend = CountingMultiAuth([TokenAuth()])
+    client = TestClient(get_app(backend))
+
+    r = client.get("/public/foo", headers={"Authorization": "Token wrong"})
+    assert r.status_code == 200
+    assert r.text == "False"
+    assert backend.calls == 0
+
+
+def test_skip_backend_without_authorization_header():
+    backend = CountingMultiAuth([TokenAuth()])
+    client = TestClient(get_app(backend))
+    r = client.get("/")
+    assert r.status_code == 403
+    assert backend.calls == 0
+    r = client.get("/", headers={"Authorization": f"Token {TOKEN}"})
+    assert r.status_code == 200
+    assert backend.calls == 1
+
+    # Backends that may read other headers are always called.
+    backend = DummyHeaderBackend(header="X-Auth-A", value="A")
+    client = TestClient(get_app(MultiAuth([TokenAuth(), backend])))
+    r = client.get("/", headers={"X-Auth-A": "A"})
+    assert r.status_code == 200
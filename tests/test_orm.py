@@ -1,3 +1,4 @@
+import asyncio
 import os
 
 import pytest
@@ -9,8 +10,9 @@ pytest.importorskip("passlib")
 @pytest.fixture(name="client")
 def fixture_client():
     from .apps.orm.token import get_app
-    from .apps.orm.models import database
+    from .apps.orm.models import database, engine, metadata
 
+    metadata.create_all(engine)
     with TestClient(get_app()) as client:
         yield client
 
@@ -38,9 +40,82 @@ def authorize_token(client, token: str):
     assert r.status_code == 200
 
 
+def revoke_token(client, token: str):
+    r = client.post("/tokens/revoke", json={"token": token})
+    assert r.status_code == 200
+    r = client.get("/", headers={"Authorization": f"Token {token}"})
+    assert r.status_code == 401
+
+
 def test_user_journey(client):
     credentials = {"username": "admin", "password": "admin"}
     register(client, credentials)
     authorize_basic(client, credentials)
     token = obtain_token(client, credentials)
     authorize_token(client, token)
+    authorize_token(client, token)
+    revoke_token(client, token)
+
+
+def test_batched_user_lookups(client):
+    from .apps.orm.token import basic_auth
+
+    for username in ("alice", "bob"):
+        register(client, {"username": username, "password": "s3kr3t"})
+
+    batches = basic_auth.user_loader.batches
+    lookups = asyncio.gather(
+        *(
+            basic_auth.find_user(username)
+            for username in ("alice", "bob", "alice", "unknown")
+        )
+    )
+    users = asyncio.get_event_loop().run_until_complete(lookups)
+    assert [user and user.username for user in users] == [
+        "alice",
+        "bob",
+        "alice",
+        None,
+    ]
+    assert basic_auth.user_loader.batches == batches + 1
+
+
+class FakeUser:
+    def __init__(self, pk: int, password: str):
+        self.pk = pk
+        self.password = password
+        self.updates = 0
+
+    async def update(self, **kwargs):
+        self.updates += 1
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_rehash_in_background():
+    from starlette_auth_toolkit.contrib.orm import ModelBasicAuth
+    from starlette_auth_toolkit.cryptography import (
+        CryptHasher,
+        MultiHasher,
+        PBKDF2Hasher,
+    )
+
+    pbkdf2, crypt = PBKDF2Hasher(), CryptHasher()
+    backend = ModelBasicAuth(
+        lambda: FakeUser,
+        hasher=MultiHasher([pbkdf2, crypt]),
+        rehash_in_background=True,
+    )
+    user = FakeUser(pk=1, password=crypt.make_sync("hello"))
+
+    results = await asyncio.gather(
+        backend.verify_password(user, "hello"),
+        backend.verify_password(user, "hello"),
+    )
+    assert results == [True, True]
+
+    await backend.wait_for_rehashes()
+    assert user.updates == 1
+    assert pbkdf2.identify(user.password)
@@ -1,12 +1,18 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import pytest
 
 from starlette_auth_toolkit.cryptography import (
+    BaseHasher,
     CryptHasher,
     Hasher,
+    HashlibPBKDF2Hasher,
     MultiHasher,
     PBKDF2Hasher,
     BCryptHasher,
     Argon2Hasher,
+    ScryptHasher,
 )
 
 pytest.importorskip("passlib")
@@ -17,7 +23,9 @@ pbkdf2 = PBKDF2Hasher()
 bcrypt = BCryptHasher()
 argon2 = Argon2Hasher()
 crypt = CryptHasher()
-HASHERS = [pbkdf2, bcrypt, argon2, crypt]
+hashlib_pbkdf2 = HashlibPBKDF2Hasher()
+scrypt = ScryptHasher(rounds=12)
+HASHERS = [pbkdf2, bcrypt, argon2, crypt, hashlib_pbkdf2, scrypt]
 
 
 @pytest.mark.slow
@@ -72,3 +80,223 @@ async def test_multi_hasher_update(hasher, deprecated_hasher):
     new_hash = await hasher.make("hello")
     assert await hasher.verify("hello", new_hash)
     assert not hasher.needs_update(new_hash)
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize(
+    "executor_class", [ThreadPoolExecutor, ProcessPoolExecutor]
+)
+async def test_hasher_executor(executor_class):
+    with executor_class(max_workers=2) as executor:
+        hasher = PBKDF2Hasher(executor=executor)
+        hashed = await hasher.make("hello")
+        assert await hasher.verify("hello", hashed)
+        assert not await hasher.verify("wrong", hashed)
+
+
+@pytest.mark.slow
+async def test_multi_hasher_verify_and_update(hasher, deprecated_hasher):
+    old_hash = await deprecated_hasher.make("hello")
+    new_hash = await hasher.make("hello")
+
+    results = await asyncio.gather(
+        hasher.verify_and_update("hello", old_hash),
+        hasher.verify_and_update("hello", new_hash),
+        hasher.verify_and_update("wrong", old_hash),
+        hasher.verify_and_update("hello", "unknown"),
+    )
+    assert results == [
+        (True, True),
+        (True, False),
+        (False, False),
+        (False, False),
+    ]
+
+
+class CountingHasher(Hasher):
+    def __init__(self, algorithm: str):
+        super().__init__(algorithm)
+        self.identify_calls = 0
+
+    def identify(self, hashed: str) -> bool:
+        self.identify_calls += 1
+        return super().identify(hashed)
+
+
+@pytest.mark.slow
+async def test_multi_hasher_dispatch():
+    pbkdf2_hasher = CountingHasher("pbkdf2_sha256")
+    crypt_hasher = CountingHasher("sha256_crypt")
+    hasher = MultiHasher([pbkdf2_hasher, crypt_hasher])
+    hashed = crypt_hasher.make_sync("hello")
+    await hasher.prepare()
+    pbkdf2_hasher.identify_calls = crypt_hasher.identify_calls = 0
+
+    assert hasher.verify_and_update_sync("hello", hashed) == (True, True)
+    assert pbkdf2_hasher.identify_calls == crypt_hasher.identify_calls == 0
+
+    # Unknown formats fall back to scanning.
+    assert hasher.verify_and_update_sync("hello", "$foo$bar") == (
+        False,
+        False,
+    )
+    assert pbkdf2_hasher.identify_calls == crypt_hasher.identify_calls == 1
+
+
+class PrefixedPlainHasher(BaseHasher):
+    # A custom hasher which only implements `.identify()`, not `.idents`.
+    def make_sync(self, secret: str) -> str:
+        return f"$plain${secret}"
+
+    def verify_sync(self, secret: str, hashed: str) -> bool:
+        return hashed == self.make_sync(secret)
+
+    def identify(self, hashed: str) -> bool:
+        return hashed.startswith("$plain$")
+
+
+async def test_multi_hasher_without_idents():
+    hasher = MultiHasher([hashlib_pbkdf2, PrefixedPlainHasher()])
+    assert hasher.verify_and_update_sync("hello", "$plain$hello") == (
+        True,
+        True,
+    )
+    hashed = hasher.make_sync("hello")
+    assert hasher.verify_and_update_sync("hello", hashed) == (True, False)
+
+
+@pytest.mark.slow
+async def test_make_and_verify_many():
+    hasher = PBKDF2Hasher()
+    passwords = [f"password{i}" for i in range(5)]
+
+    hashes = [h async for h in hasher.make_many(passwords, concurrency=2)]
+    assert len(hashes) == len(passwords)
+
+    pairs = list(zip(passwords, hashes)) + [("wrong", hashes[0])]
+    results = [v async for v in hasher.verify_many(pairs, concurrency=2)]
+    assert results == [True] * len(passwords) + [False]
+
+
+@pytest.mark.slow
+async def test_hasher_settings_pickling():
+    hasher = PBKDF2Hasher(rounds=1000)
+    hashed = hasher.make_sync("hello")
+    assert "$1000$" in hashed
+    assert not hasher.needs_update(hashed)
+
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        hasher.executor = executor
+        assert await hasher.verify("hello", hashed)
+        assert "$1000$" in await hasher.make("hello")
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("hasher_class", [PBKDF2Hasher, BCryptHasher])
+async def test_calibrate(hasher_class):
+    hasher = hasher_class.calibrate(target=0.005)
+    assert "rounds" in hasher.settings
+    hashed = hasher.make_sync("hello")
+    assert hasher.verify_sync("hello", hashed)
+    assert not hasher.needs_update(hashed)
+    assert hasher.needs_update(hasher_class().make_sync("hello"))
+
+
+@pytest.mark.slow
+async def test_calibrate_from_rounds():
+    hasher = PBKDF2Hasher.calibrate(target=0.005, rounds=1000)
+    assert "rounds" in hasher.settings
+    assert hasher.verify_sync("hello", hasher.make_sync("hello"))
+
+
+@pytest.mark.slow
+async def test_calibrate_unreachable_target():
+    # Rounds are clamped to the algorithm's minimum.
+    hasher = BCryptHasher.calibrate(target=1e-9)
+    assert hasher.settings["rounds"] == 4
+
+
+async def test_calibrate_unsupported():
+    with pytest.raises(ValueError):
+        Hasher.calibrate("plaintext", target=0.1)
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize(
+    "native, hasher",
+    [
+        (hashlib_pbkdf2, pbkdf2),
+        (scrypt, Hasher("scrypt", rounds=12)),
+        (HashlibPBKDF2Hasher(digest="sha512"), Hasher("pbkdf2_sha512")),
+    ],
+)
+async def test_native_hasher_passlib_compatibility(native, hasher):
+    assert hasher.verify_sync("hello", native.make_sync("hello"))
+    hashed = hasher.make_sync("hello")
+    assert native.identify(hashed)
+    assert native.verify_sync("hello", hashed)
+    assert not native.verify_sync("goodbye", hashed)
+    assert not native.identify(crypt.make_sync("hello"))
+
+
+async def test_native_hasher_needs_update():
+    hashed = scrypt.make_sync("hello")
+    assert not scrypt.needs_update(hashed)
+    assert ScryptHasher(rounds=13).needs_update(hashed)
+
+    hasher = MultiHasher([HashlibPBKDF2Hasher(rounds=1000), scrypt])
+    assert await hasher.verify_and_update("hello", hashed) == (True, True)
+
+
+@pytest.mark.parametrize(
+    "hashers",
+    [
+        [HashlibPBKDF2Hasher(rounds=1000)],
+        [HashlibPBKDF2Hasher(rounds=1000), pbkdf2],
+    ],
+)
+async def test_native_default_hasher_in_multi_hasher(hashers):
+    hasher = MultiHasher(hashers)
+    index = hasher._index  # pylint: disable=protected-access
+    assert "$pbkdf2-sha256$" in index
+    hashed = hasher.make_sync("hello")
+    assert await hasher.verify_and_update("hello", hashed) == (True, False)
+
+
+async def test_lazy_loading():
+    hasher = Hasher("bcrypt")
+    assert hasher._handler is None  # pylint: disable=protected-access
+
+    multi_hasher = MultiHasher([hasher])
+    assert hasher._handler is None  # pylint: disable=protected-access
+
+    dummy_hash = await multi_hasher.prepare()
+    assert hasher.identify(dummy_hash)
+    assert (
+        MultiHasher([hasher], dummy_hash=dummy_hash)._dummy_hash == dummy_hash
+    )
+
+
+@pytest.mark.slow
+async def test_prepare_with_process_pool():
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        hasher = MultiHasher([PBKDF2Hasher(rounds=1000)], executor=executor)
+        dummy_hash = await hasher.prepare()
+
+    # pylint: disable=protected-access
+    assert hasher._dummy_hash_cache == dummy_hash
+    assert hasher._index_cache
+
+
+@pytest.mark.slow
+async def test_multi_hasher_with_process_pool():
+    old_hasher = PBKDF2Hasher(rounds=1000)
+    hashed = old_hasher.make_sync("hello")
+
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        hasher = MultiHasher(
+            [PBKDF2Hasher(rounds=2000), old_hasher], executor=executor
+        )
+        assert await hasher.verify("hello", hashed)
+        assert hasher.needs_update(hashed)
+        assert await hasher.verify_and_update("hello", hashed) == (True, True)
@@ -0,0 +1,30 @@
+import string
+
+import pytest
+
+from starlette_auth_toolkit.cryptography import (
+    generate_random_string,
+    generate_random_strings,
+)
+
+
+def test_generate_random_string():
+    value = generate_random_string(size=64)
+    assert len(value) == 64
+    assert set(value) <= set(generate_random_string.alphabet)
+
+
+def test_generate_random_strings():
+    values = generate_random_strings(100, size=16)
+    assert len(values) == 100
+    assert all(len(value) == 16 for value in values)
+    assert len(set(values)) == 100
+    assert set("".join(values)) <= set(generate_random_string.alphabet)
+
+
+@pytest.mark.parametrize("alphabet", ["01", string.hexdigits, "αβγ"])
+def test_custom_alphabet(monkeypatch, alphabet):
+    monkeypatch.setattr(generate_random_string, "alphabet", alphabet)
+    value = generate_random_string(size=256)
+    assert len(value) == 256
+    assert set(value) == set(alphabet)
@@ -0,0 +1,127 @@
+import asyncio
+import base64
+
+import pytest
+from starlette.authentication import SimpleUser
+from starlette.requests import HTTPConnection
+from starlette.testclient import TestClient
+
+from starlette_auth_toolkit.base.backends import BaseBasicAuth
+from starlette_auth_toolkit.exceptions import (
+    InvalidCredentials,
+    TooManyAttempts,
+)
+from starlette_auth_toolkit.ratelimit import MemoryStore, RateLimiter
+
+from .apps.dummy.basic import PASSWORD, USERNAME, BasicAuth
+from .apps.utils import get_base_app
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter():
+    timer = FakeTimer()
+    limiter = RateLimiter(limit=3, period=10, timer=timer)
+
+    for _ in range(3):
+        assert not await limiter.is_limited("foo")
+        await limiter.hit("foo")
+    assert await limiter.is_limited("foo")
+    assert not await limiter.is_limited("bar")
+
+    # Hits are forgotten progressively.
+    timer.now += 10 / 3
+    assert not await limiter.is_limited("foo")
+    await limiter.hit("foo")
+    assert await limiter.is_limited("foo")
+
+
+@pytest.mark.asyncio
+async def test_acquire_and_refund():
+    timer = FakeTimer()
+    limiter = RateLimiter(limit=2, period=10, timer=timer)
+
+    assert await limiter.acquire("foo")
+    assert await limiter.acquire("foo")
+    assert not await limiter.acquire("foo")
+
+    await limiter.refund("foo")
+    assert await limiter.acquire("foo")
+    assert not await limiter.acquire("foo")
+
+
+@pytest.mark.asyncio
+async def test_memory_store_sweeps_expired_keys():
+    timer = FakeTimer()
+    store = MemoryStore(sweep_interval=60, timer=timer)
+    await store.set("foo", timer.now + 10)
+    await store.set("bar", timer.now + 100)
+
+    timer.now += 60
+    await store.set("baz", timer.now + 10)
+    assert len(store) == 2
+    assert await store.get("foo") is None
+
+
+class RateLimitedBasicAuth(BasicAuth):
+    username_limiter = RateLimiter(limit=2, period=60)
+    client_limiter = RateLimiter(limit=3, period=60)
+
+
+def test_basic_auth_rate_limits():
+    client = TestClient(get_base_app(backend=RateLimitedBasicAuth()))
+
+    for _ in range(2):
+        r = client.get("/", auth=(USERNAME, "wrong"))
+        assert r.status_code == 401
+        assert "Could not authenticate" in r.text
+
+    r = client.get("/", auth=(USERNAME, PASSWORD))
+    assert r.status_code == 401
+    assert "Too many" in r.text
+
+    r = client.get("/", auth=("other", "wrong"))
+    assert "Could not authenticate" in r.text
+    r = client.get("/", auth=("another", PASSWORD))
+    assert "Too many" in r.text
+
+
+class SlowBasicAuth(BaseBasicAuth):
+    username_limiter = RateLimiter(limit=3, period=60)
+
+    def __init__(self):
+        self.verified = 0
+
+    async def find_user(self, username: str):
+        return SimpleUser(username)
+
+    async def verify_password(self, user, password: str) -> bool:
+        self.verified += 1
+        await asyncio.sleep(0.01)
+        return False
+
+
+@pytest.mark.asyncio
+async def test_concurrent_attempts_cannot_exceed_limits():
+    backend = SlowBasicAuth()
+    conn = HTTPConnection({"type": "http", "client": ("127.0.0.1", 1234)})
+    credentials = base64.b64encode(b"bob:wrong").decode()
+
+    results = await asyncio.gather(
+        *(
+            backend.authenticate_credentials(conn, credentials)
+            for _ in range(200)
+        ),
+        return_exceptions=True,
+    )
+
+    assert backend.verified == 3
+    assert sum(isinstance(r, InvalidCredentials) for r in results) == 3
+    assert sum(isinstance(r, TooManyAttempts) for r in results) == 197
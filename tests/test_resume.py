@@ -0,0 +1,133 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.authentication import AuthCredentials, SimpleUser
+from starlette.requests import HTTPConnection
+from starlette.responses import PlainTextResponse
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from starlette_auth_toolkit.backends import MultiAuth
+from starlette_auth_toolkit.base.backends import (
+    RESUME_TICKET_SCOPE_KEY,
+    BaseTokenAuth,
+)
+from starlette_auth_toolkit.middleware import AuthMiddleware
+from starlette_auth_toolkit.signing import Signer
+
+
+class TokenAuth(BaseTokenAuth):
+    resume_signer = Signer(["s3kr3t"], expires_in=60)
+
+    def __init__(self):
+        self.verifications = 0
+
+    async def verify(self, token: str):
+        self.verifications += 1
+        return SimpleUser("bob") if token == "t0k3n" else None
+
+
+class BearerAuth(TokenAuth):
+    scheme = "Bearer"
+    resume_signer = Signer(["0th3r"], expires_in=60)
+
+
+def get_app(backend) -> Starlette:
+    app = Starlette()
+    app.add_middleware(AuthMiddleware, backend=backend)
+
+    @app.websocket_route("/ws")
+    async def ws(websocket):
+        await websocket.accept()
+        await websocket.send_json(
+            {
+                "user": websocket.user.display_name,
+                "scopes": websocket.auth.scopes,
+                "ticket": websocket.scope.get(RESUME_TICKET_SCOPE_KEY),
+            }
+        )
+        await websocket.close()
+
+    return app
+
+
+@pytest.mark.parametrize("multi", [False, True])
+def test_resume_ticket(multi):
+    backend = TokenAuth()
+    client = TestClient(get_app(MultiAuth([backend]) if multi else backend))
+
+    with client.websocket_connect(
+        "/ws", headers={"Authorization": "Token t0k3n"}
+    ) as websocket:
+        data = websocket.receive_json()
+    assert data["user"] == "bob"
+    ticket = data["ticket"]
+    assert ticket is not None
+
+    for _ in range(3):
+        with client.websocket_connect(
+            "/ws", headers={"Authorization": f"Resume {ticket}"}
+        ) as websocket:
+            data = websocket.receive_json()
+        assert data == {
+            "user": "bob",
+            "scopes": ["authenticated"],
+            "ticket": None,
+        }
+    assert backend.verifications == 1
+
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect(
+            "/ws", headers={"Authorization": f"Resume {ticket}x"}
+        ) as websocket:
+            websocket.receive_json()
+
+
+def test_resume_ticket_with_different_signers():
+    backend = BearerAuth()
+    client = TestClient(get_app(MultiAuth([TokenAuth(), backend])))
+
+    with client.websocket_connect(
+        "/ws", headers={"Authorization": "Bearer t0k3n"}
+    ) as websocket:
+        ticket = websocket.receive_json()["ticket"]
+
+    with client.websocket_connect(
+        "/ws", headers={"Authorization": f"Resume {ticket}"}
+    ) as websocket:
+        assert websocket.receive_json()["user"] == "bob"
+    assert backend.verifications == 1
+
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect(
+            "/ws", headers={"Authorization": f"Resume {ticket}x"}
+        ) as websocket:
+            websocket.receive_json()
+
+
+@pytest.mark.parametrize("multi", [False, True])
+def test_resume_ticket_not_accepted_over_http(multi):
+    backend = TokenAuth()
+    ticket = backend.create_resume_ticket(
+        AuthCredentials(["authenticated"]), SimpleUser("bob")
+    )
+    app = get_app(MultiAuth([backend]) if multi else backend)
+
+    @app.route("/")
+    async def home(request):
+        return PlainTextResponse(request.user.display_name)
+
+    client = TestClient(app)
+    r = client.get("/", headers={"Authorization": f"Resume {ticket}"})
+    assert r.status_code == 200
+    assert r.text == ""
+
+
+@pytest.mark.asyncio
+async def test_resume_ticket_not_issued_over_http():
+    backend = TokenAuth()
+    scope = {
+        "type": "http",
+        "headers": [(b"authorization", b"Token t0k3n")],
+    }
+    assert await backend.authenticate(HTTPConnection(scope)) is not None
+    assert RESUME_TICKET_SCOPE_KEY not in scope
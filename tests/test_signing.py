@@ -0,0 +1,71 @@
+import pytest
+from starlette.testclient import TestClient
+
+from starlette_auth_toolkit.backends import SignedTokenAuth
+from starlette_auth_toolkit.cache import TTLCache
+from starlette_auth_toolkit.signing import Signer
+
+from .apps.utils import get_base_app
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_signer():
+    timer = FakeTimer()
+    signer = Signer(["s3kr3t"], expires_in=60, timer=timer)
+
+    token = signer.dumps({"sub": "bob"})
+    claims = signer.loads(token)
+    assert claims is not None
+    assert claims["sub"] == "bob"
+    assert claims["exp"] == timer.now + 60
+
+    header, payload, _ = token.split(".")
+    assert signer.loads(f"{header}.{payload}.invalid") is None
+    assert signer.loads(f"{header}.{payload}.") is None
+    assert signer.loads("foo") is None
+
+    timer.now += 60
+    assert signer.loads(token) is None
+
+
+def test_signer_key_rotation():
+    old_signer = Signer(["old"])
+    new_signer = Signer(["new", "old"])
+    token = old_signer.dumps({"sub": "bob"})
+
+    assert new_signer.loads(token) is not None
+    assert old_signer.loads(new_signer.dumps({"sub": "bob"})) is None
+
+
+def test_signer_audience():
+    signer = Signer(["s3kr3t"], audience="api")
+    assert signer.loads(signer.dumps({"sub": "bob"})) is not None
+    other_signer = Signer(["s3kr3t"], audience="other")
+    assert other_signer.loads(signer.dumps({"sub": "bob"})) is None
+
+
+backend = SignedTokenAuth(Signer(["s3kr3t"]), cache=TTLCache(ttl=60))
+
+
+@pytest.fixture(name="client")
+def fixture_client():
+    return TestClient(get_base_app(backend=backend))
+
+
+def test_signed_token_auth(client):
+    token = backend.create_token("bob")
+
+    for _ in range(2):
+        r = client.get("/", headers={"Authorization": f"Token {token}"})
+        assert r.status_code == 200
+    assert backend.cache.hits == 1
+
+    r = client.get("/", headers={"Authorization": f"Token {token}x"})
+    assert r.status_code == 401
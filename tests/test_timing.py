@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from starlette.authentication import SimpleUser
+
+from starlette_auth_toolkit.base.backends import BaseBasicAuth
+from starlette_auth_toolkit.cryptography import DUMMY_SECRET, BaseHasher
+from starlette_auth_toolkit.timing import ConstantDelay, DummyVerification
+
+pytestmark = pytest.mark.asyncio
+
+
+class CountingHasher(BaseHasher):
+    def __init__(self):
+        super().__init__()
+        self.made = 0
+        self.verified = []
+
+    def make_sync(self, secret: str) -> str:
+        self.made += 1
+        return f"hashed:{secret}"
+
+    def verify_sync(self, secret: str, hashed: str) -> bool:
+        self.verified.append((secret, hashed))
+        return hashed == f"hashed:{secret}"
+
+
+class BasicAuth(BaseBasicAuth):
+    def __init__(self, timing_strategy):
+        self.timing_strategy = timing_strategy
+
+    async def find_user(self, username: str):
+        return SimpleUser(username) if username == "bob" else None
+
+    async def verify_password(self, user, password: str) -> bool:
+        return password == "s3kr3t"
+
+
+async def test_dummy_verification():
+    hasher = CountingHasher()
+    backend = BasicAuth(DummyVerification(hasher))
+
+    assert await backend.verify("bob", "s3kr3t") is not None
+    assert hasher.verified == []
+
+    for _ in range(2):
+        assert await backend.verify("alice", "s3kr3t") is None
+    assert hasher.made == 1
+    assert hasher.verified == [("s3kr3t", f"hashed:{DUMMY_SECRET}")] * 2
+
+
+async def test_dummy_verification_computes_dummy_hash_once():
+    hasher = CountingHasher()
+    strategy = DummyVerification(hasher)
+
+    await asyncio.gather(
+        *(strategy.on_unknown_user("s3kr3t") for _ in range(5))
+    )
+    assert hasher.made == 1
+    assert len(hasher.verified) == 5
+
+    strategy = DummyVerification(hasher)
+    dummy_hash = await strategy.prepare()
+    assert dummy_hash == f"hashed:{DUMMY_SECRET}"
+    await strategy.on_unknown_user("s3kr3t")
+    assert hasher.made == 2
+
+
+async def test_constant_delay(monkeypatch):
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr("asyncio.sleep", fake_sleep)
+    strategy = ConstantDelay.calibrate(CountingHasher(), samples=3)
+    backend = BasicAuth(strategy)
+
+    assert await backend.verify("alice", "s3kr3t") is None
+    assert delays == [strategy.delay]
+    assert strategy.delay > 0